@@ -1,26 +1,283 @@
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
+import metrics
 
 load_dotenv()
 
 CLIENT_ID = os.getenv("PROKERALA_CLIENT_ID")
 CLIENT_SECRET = os.getenv("PROKERALA_CLIENT_SECRET")
 
-def get_access_token():
-    url = "https://api.prokerala.com/token"
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
+# Override to point the clients at a local mock server
+PROKERALA_BASE_URL = os.getenv("PROKERALA_BASE_URL", "https://api.prokerala.com").rstrip("/")
+TOKEN_URL = f"{PROKERALA_BASE_URL}/token"
+ASTROLOGY_URL = f"{PROKERALA_BASE_URL}/v2/astrology"
+
+def _observe(endpoint, status, start):
+    elapsed = time.perf_counter() - start
+    metrics.UPSTREAM_SECONDS.observe(elapsed, endpoint, status)
+    metrics.record_timing(f"prokerala{endpoint}", elapsed)
+
+class ProkeralaClient:
+    """Thread-safe Prokerala client: one keep-alive connection pool and a cached OAuth token."""
+
+    def __init__(self, client_id=None, client_secret=None, pool_size=40, timeout=30,
+                 token_refresh_margin=60, base_url=None):
+        self.client_id = client_id or CLIENT_ID
+        self.client_secret = client_secret or CLIENT_SECRET
+        self.token_url = f"{base_url.rstrip('/')}/token" if base_url else TOKEN_URL
+        self.astrology_url = f"{base_url.rstrip('/')}/v2/astrology" if base_url else ASTROLOGY_URL
+        self.timeout = timeout
+        self.token_refresh_margin = token_refresh_margin
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+    def _token_valid(self):
+        return self._token is not None and time.monotonic() < self._token_expires_at
+
+    def get_access_token(self):
+        if self._token_valid():
+            return self._token
+        # Only one thread refreshes; the others wait and reuse its token
+        with self._token_lock:
+            if self._token_valid():
+                return self._token
+            data = {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+            response = self._request("POST", self.token_url, "/token", data=data)
+            response.raise_for_status()
+            payload = response.json()
+            expires_in = float(payload.get("expires_in", 3600))
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + max(expires_in - self.token_refresh_margin, 0)
+            return self._token
+
+    def invalidate_token(self, token):
+        with self._token_lock:
+            if self._token == token:
+                self._token = None
+                self._token_expires_at = 0.0
+
+    def _request(self, method, url, endpoint, **kwargs):
+        # Latency and status of every upstream call, labelled by endpoint path
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            status = str(response.status_code)
+            return response
+        except requests.Timeout:
+            status = "timeout"
+            raise
+        finally:
+            _observe(endpoint, status, start)
+
+    def _get(self, path, params):
+        token = self.get_access_token()
+        response = self._request(
+            "GET", f"{self.astrology_url}{path}", path,
+            headers={"Authorization": f"Bearer {token}"},
+            params=params,
+        )
+        if response.status_code == 401:
+            # Token revoked before its advertised expiry: refresh once and retry
+            self.invalidate_token(token)
+            token = self.get_access_token()
+            response = self._request(
+                "GET", f"{self.astrology_url}{path}", path,
+                headers={"Authorization": f"Bearer {token}"},
+                params=params,
+            )
+        response.raise_for_status()
+        return response
+
+    def get_kundli(self, ayanamsa, coordinates, datetime_str):
+        params = {
+            "ayanamsa": ayanamsa,
+            "coordinates": coordinates,
+            "datetime": datetime_str,
+        }
+        return self._get("/kundli", params).json()
+
+    def get_kundli_advanced(self, ayanamsa, coordinates, datetime_str):
+        params = {
+            "ayanamsa": ayanamsa,
+            "coordinates": coordinates,
+            "datetime": datetime_str,
+        }
+        return self._get("/kundli/advanced", params).json()
+
+    def get_chart(self, ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                  la=None, upagraha_position=None):
+        return self._get("/chart", chart_params(
+            ayanamsa, coordinates, datetime_str, chart_type, chart_style, format, la, upagraha_position
+        )).text
+
+class AsyncProkeralaClient:
+    """asyncio Prokerala client for the FastAPI routes.
+
+    A semaphore caps in-flight upstream requests; every request carries its own timeout.
+    Pass transport= (e.g. httpx.MockTransport) or base_url= to test against a local mock.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, base_url=None, max_concurrency=100,
+                 timeout=30, token_refresh_margin=60, transport=None):
+        self.client_id = client_id or CLIENT_ID
+        self.client_secret = client_secret or CLIENT_SECRET
+        self.base_url = (base_url or PROKERALA_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.token_refresh_margin = token_refresh_margin
+        self.transport = transport
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _token_valid(self):
+        return self._token is not None and time.monotonic() < self._token_expires_at
+
+    async def get_access_token(self):
+        if self._token_valid():
+            return self._token
+        async with self._token_lock:
+            if self._token_valid():
+                return self._token
+            data = {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            }
+            response = await self._request("POST", "/token", "/token", data=data)
+            response.raise_for_status()
+            payload = response.json()
+            expires_in = float(payload.get("expires_in", 3600))
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + max(expires_in - self.token_refresh_margin, 0)
+            return self._token
+
+    async def invalidate_token(self, token):
+        async with self._token_lock:
+            if self._token == token:
+                self._token = None
+                self._token_expires_at = 0.0
+
+    async def _request(self, method, url, endpoint, **kwargs):
+        async with self._semaphore:
+            # Timed once a slot is free, so the latency excludes queueing behind the cap
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                status = str(response.status_code)
+                return response
+            except httpx.TimeoutException:
+                status = "timeout"
+                raise
+            finally:
+                _observe(endpoint, status, start)
+
+    async def _get(self, path, params, timeout=None):
+        timeout = timeout or self.timeout
+        token = await self.get_access_token()
+        response = await self._request(
+            "GET", f"/v2/astrology{path}", path,
+            headers={"Authorization": f"Bearer {token}"},
+            params=params,
+            timeout=timeout,
+        )
+        if response.status_code == 401:
+            # Token revoked before its advertised expiry: refresh once and retry
+            await self.invalidate_token(token)
+            token = await self.get_access_token()
+            response = await self._request(
+                "GET", f"/v2/astrology{path}", path,
+                headers={"Authorization": f"Bearer {token}"},
+                params=params,
+                timeout=timeout,
+            )
+        response.raise_for_status()
+        return response
+
+    async def get_kundli(self, ayanamsa, coordinates, datetime_str, timeout=None):
+        params = {
+            "ayanamsa": ayanamsa,
+            "coordinates": coordinates,
+            "datetime": datetime_str,
+        }
+        return (await self._get("/kundli", params, timeout)).json()
+
+    async def get_kundli_advanced(self, ayanamsa, coordinates, datetime_str, timeout=None):
+        params = {
+            "ayanamsa": ayanamsa,
+            "coordinates": coordinates,
+            "datetime": datetime_str,
+        }
+        return (await self._get("/kundli/advanced", params, timeout)).json()
+
+    async def get_chart(self, ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                        la=None, upagraha_position=None, timeout=None):
+        params = chart_params(
+            ayanamsa, coordinates, datetime_str, chart_type, chart_style, format, la, upagraha_position
+        )
+        return (await self._get("/chart", params, timeout)).text
+
+def chart_params(ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                 la=None, upagraha_position=None):
+    params = {
+        "ayanamsa": ayanamsa,
+        "coordinates": coordinates,
+        "datetime": datetime_str,
+        "chart_type": chart_type,
+        "chart_style": chart_style,
+        "format": format
     }
-    response = requests.post(url, data=data)
-    response.raise_for_status()
-    return response.json()["access_token"]
+    if la:
+        params["la"] = la
+    if upagraha_position:
+        params["upagraha_position"] = upagraha_position
+    return params
+
+# Shared client behind the module-level helpers below
+default_client = ProkeralaClient()
+
+def get_access_token():
+    return default_client.get_access_token()
 
 def get_kundli(access_token, ayanamsa, coordinates, datetime_str):
-    url = "https://api.prokerala.com/v2/astrology/kundli"
+    url = f"{ASTROLOGY_URL}/kundli"
     headers = {
         "Authorization": f"Bearer {access_token}",
     }
@@ -29,12 +286,12 @@ def get_kundli(access_token, ayanamsa, coordinates, datetime_str):
         "coordinates": coordinates,
         "datetime": datetime_str,
     }
-    response = requests.get(url, headers=headers, params=params)
+    response = default_client.session.get(url, headers=headers, params=params, timeout=default_client.timeout)
     response.raise_for_status()
     return response.json()
 
 def get_kundli_advanced(access_token, ayanamsa, coordinates, datetime_str):
-    url = "https://api.prokerala.com/v2/astrology/kundli/advanced"
+    url = f"{ASTROLOGY_URL}/kundli/advanced"
     headers = {
         "Authorization": f"Bearer {access_token}",
     }
@@ -43,33 +300,22 @@ def get_kundli_advanced(access_token, ayanamsa, coordinates, datetime_str):
         "coordinates": coordinates,
         "datetime": datetime_str,
     }
-    response = requests.get(url, headers=headers, params=params)
+    response = default_client.session.get(url, headers=headers, params=params, timeout=default_client.timeout)
     response.raise_for_status()
     return response.json()
 
 def get_chart(access_token, ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
               la=None, upagraha_position=None):
-    url = "https://api.prokerala.com/v2/astrology/chart"
+    url = f"{ASTROLOGY_URL}/chart"
     headers = {
         "Authorization": f"Bearer {access_token}",
     }
-    params = {
-        "ayanamsa": ayanamsa,
-        "coordinates": coordinates,
-        "datetime": datetime_str,
-        "chart_type": chart_type,
-        "chart_style": chart_style,
-        "format": format
-    }
-    if la:
-        params["la"] = la
-    if upagraha_position:
-        params["upagraha_position"] = upagraha_position
-    response = requests.get(url, headers=headers, params=params)
+    params = chart_params(ayanamsa, coordinates, datetime_str, chart_type, chart_style, format, la, upagraha_position)
+    response = default_client.session.get(url, headers=headers, params=params, timeout=default_client.timeout)
     response.raise_for_status()
     return response.text
 if __name__ == "__main__":
-    access_token = get_access_token()
+    client = ProkeralaClient()
     # Example parameters
     ayanamsa = 1  # Lahiri
     coordinates = "23.1765,75.7885"
@@ -77,17 +323,16 @@ if __name__ == "__main__":
     # Encode datetime for URL safety (requests handles this, but for manual URLs use urllib.parse.quote)
 
     print("--- /v2/astrology/kundli ---")
-    kundli = get_kundli(access_token, ayanamsa, coordinates, datetime_str)
+    kundli = client.get_kundli(ayanamsa, coordinates, datetime_str)
     print(kundli)
 
     print("\n--- /v2/astrology/kundli/advanced ---")
-    kundli_adv = get_kundli_advanced(access_token, ayanamsa, coordinates, datetime_str)
+    kundli_adv = client.get_kundli_advanced(ayanamsa, coordinates, datetime_str)
     print(kundli_adv)
 
     print("\n--- /v2/astrology/chart (SVG) ---")
     # Example: rasi chart, north-indian style, svg format
-    chart_svg = get_chart(
-        access_token,
+    chart_svg = client.get_chart(
         ayanamsa=ayanamsa,
         coordinates=coordinates,
         datetime_str=datetime_str,
@@ -95,4 +340,4 @@ if __name__ == "__main__":
         chart_style="north-indian",
         format="svg"
     )
-    print(chart_svg)
\ No newline at end of file
+    print(chart_svg)
@@ -0,0 +1,307 @@
+"""Benchmark suite for the calculation layer and the FastAPI routes.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 0.25
+
+Places come from benchmarks.corpus through a preloaded GeocodeCache and Prokerala is
+replaced by an in-process mock transport, so runs need no network. With --baseline
+the exit status is 1 when any benchmark's median is more than threshold slower.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.corpus import PLACES, SEED, preload, records
+
+SUITES = ("stages", "calc", "api", "startup")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def summarize(samples):
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "mean_ms": total / len(samples) * 1000,
+        "ops_per_sec": len(samples) / total if total else None,
+    }
+
+def timed_calls(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_stages(recs):
+    # Each stage on its own: dependencies run untimed, then the stage method is timed
+    import ephemeris
+    from geocode_cache import GeocodeCache
+    from kundli_calculator import STAGES, KundliCalculator
+    calc = KundliCalculator(geocode_cache=preload(GeocodeCache()))
+    for dob, tob, place in recs[:5]:
+        calc.calculate_kundli(dob, tob, place)
+    ephemeris.sunrise_sunset.cache_clear()
+    results = {}
+    for stage, (deps, method) in STAGES.items():
+        samples = []
+        for dob, tob, place in recs:
+            ctx = calc._new_context(dob, tob, place, None)
+            calc._run_stages(ctx, deps)
+            start = time.perf_counter()
+            getattr(calc, method)(ctx)
+            samples.append(time.perf_counter() - start)
+        results[f"stage.{stage}"] = summarize(samples)
+    return results
+
+def bench_calc(recs):
+    import electional
+    import ephemeris
+    import panchang
+    import serialization
+    import transits
+    import vargas
+    import yoga_rules
+    from geocode_cache import GeocodeCache
+    from kundli_calculator import KundliCalculator
+    from matching import KEYS, MatchPool
+    calc = KundliCalculator(geocode_cache=preload(GeocodeCache()))
+    calc.calculate_kundli(*recs[0])
+    results = {}
+    ephemeris.sunrise_sunset.cache_clear()
+    results["kundli.full"] = summarize(timed_calls(lambda r: calc.calculate_kundli(*r), recs))
+    results["kundli.panchang_fields"] = summarize(
+        timed_calls(lambda r: calc.calculate_kundli(*r, fields="panchang"), recs)
+    )
+    results["kundli.match_profile"] = summarize(timed_calls(lambda r: calc.match_profile(*r), recs))
+
+    def dasha_active(r):
+        calc.vimshottari_dasha(*r).active_at(2460000.5, 5)
+    results["dasha.active_at"] = summarize(timed_calls(dasha_active, recs))
+
+    lat, lon, tz = PLACES["Delhi, India"]
+
+    def panchang_year(year):
+        ephemeris.sunrise_sunset.cache_clear()
+        panchang.daily_panchang(lat, lon, tz, f"{year}-01-01", 366)
+    results["panchang.year"] = summarize(timed_calls(panchang_year, [2021, 2022, 2023]))
+
+    def transit_year(start_jd):
+        list(transits.iter_transits(start_jd, start_jd + 365))
+    results["transits.year"] = summarize(timed_calls(transit_year, [2459215.5, 2459580.5]))
+
+    constraints = [
+        {"quantity": "nakshatra", "values": ["Rohini"]},
+        {"quantity": "tithi", "values": ["Shukla"]},
+        {"quantity": "combust", "body": "Jupiter", "values": [True], "negate": True},
+        {"quantity": "ascendant", "values": ["Taurus", "Leo"]},
+    ]
+    results["electional.year"] = summarize(timed_calls(
+        lambda year: electional.search(lat, lon, tz, f"{year}-01-01", 365, constraints), [2021, 2022, 2023]
+    ))
+
+    rng = np.random.default_rng(SEED)
+    lons = rng.random((10000, 10)) * 360
+    results["vargas.batch_10k"] = summarize(timed_calls(vargas.all_varga_signs, [lons] * 5))
+    signs = rng.integers(12, size=(10000, 10))
+    results["yogas.batch_10k"] = summarize(
+        timed_calls(lambda s: yoga_rules.ENGINE.detect_batch(s[:, 0], s[:, 1:]), [signs] * 5)
+    )
+
+    # A batch response body of 100 full kundlis, JSON and MessagePack
+    batch = {"success": True, "results": [{"success": True, "kundli": calc.calculate_kundli(*r)} for r in recs[:100]]}
+    results["serialize.batch_100.json"] = summarize(timed_calls(serialization.dumps_json, [batch] * 20))
+    results["serialize.batch_100.msgpack"] = summarize(timed_calls(serialization.dumps_msgpack, [batch] * 20))
+
+    pool = MatchPool()
+    pool.add_many(
+        (str(i), "female" if i % 2 else "male", int(key), int(house))
+        for i, (key, house) in enumerate(zip(rng.integers(KEYS, size=200000), rng.integers(1, 13, size=200000)))
+    )
+    pool.top_matches(0, "male", k=1)
+    results["match.top_50_of_100k"] = summarize(
+        timed_calls(lambda key: pool.top_matches(key, "male", 1, k=50), range(KEYS))
+    )
+    return results
+
+def mock_prokerala(upstream_latency):
+    import httpx
+
+    async def handler(request):
+        if upstream_latency:
+            await asyncio.sleep(upstream_latency)
+        if request.url.path == "/token":
+            return httpx.Response(200, json={"access_token": "benchmark", "expires_in": 3600})
+        if request.url.path.endswith("/chart"):
+            return httpx.Response(200, text="<svg xmlns='http://www.w3.org/2000/svg'></svg>")
+        return httpx.Response(200, json={"status": "ok", "data": {"path": request.url.path}})
+    return httpx.MockTransport(handler)
+
+async def _api_requests(client, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(method, url, kwargs):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*call) for call in calls))
+    result = summarize(samples)
+    result["ops_per_sec"] = len(samples) / (time.perf_counter() - started)
+    return result
+
+async def _bench_api(recs, concurrency, upstream_latency):
+    import httpx
+    import main
+    from api import AsyncProkeralaClient
+    preload(main.geocode_cache)
+    main.prokerala = AsyncProkeralaClient("benchmark", "benchmark", transport=mock_prokerala(upstream_latency))
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        kundli = [("POST", "/generate_kundli", {"json": {"dob": d, "tob": t, "place": p}}) for d, t, p in recs]
+        await _api_requests(client, kundli[:5], 1)
+        results["api.generate_kundli.serial"] = await _api_requests(client, kundli, 1)
+        results["api.generate_kundli.concurrent"] = await _api_requests(client, kundli, concurrency)
+        panchang_fields = [("POST", "/generate_kundli?fields=panchang", kwargs) for _, _, kwargs in kundli]
+        results["api.generate_kundli.panchang_fields"] = await _api_requests(client, panchang_fields, concurrency)
+        prokerala = [
+            ("GET", "/prokerala/kundli", {"params": {"coordinates": "28.6139,77.2090",
+                                                     "datetime_str": f"{d}T{t}+05:30"}})
+            for d, t, _ in recs
+        ]
+        results["api.prokerala_kundli.miss"] = await _api_requests(client, prokerala, concurrency)
+        results["api.prokerala_kundli.hit"] = await _api_requests(client, prokerala, concurrency)
+        month = [("GET", "/panchang", {"params": {"place": "Delhi, India", "start": "2024-01-01",
+                                                  "end": "2024-02-01"}})] * 5
+        results["api.panchang.month"] = await _api_requests(client, month, 1)
+        charts = [("GET", "/chart", {"params": {"dob": d, "tob": t, "place": p, "chart_type": "navamsa"}})
+                  for d, t, p in recs]
+        results["api.chart.miss"] = await _api_requests(client, charts, concurrency)
+        results["api.chart.hit"] = await _api_requests(client, charts, concurrency)
+    await main.prokerala.aclose()
+    return results
+
+def bench_api(recs, concurrency=16, upstream_latency=0.0):
+    return asyncio.run(_bench_api(recs, concurrency, upstream_latency))
+
+def bench_startup(runs=5):
+    # Fresh interpreters: importing main (until the server could accept connections), and
+    # import plus the warm-up that /ready waits for
+    scripts = {
+        "startup.import_main": "import main",
+        "startup.ready": "import main; main.warm_up(); assert main.warm_up_error is None, main.warm_up_error",
+    }
+    results = {}
+    for name, script in scripts.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+    return results
+
+def compare(results, baseline, threshold, noise_floor_ms=0.05):
+    # -> (rows, regressed) over the benchmarks present in both runs; a row is
+    # (name, baseline median, current median, ratio, status). A slowdown under
+    # noise_floor_ms is never a regression: sub-0.1 ms stages jitter by more than any threshold.
+    rows = []
+    regressed = False
+    for name, base in sorted(baseline["results"].items()):
+        current = results.get(name)
+        if current is None:
+            continue
+        ratio = current["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        status = "ok"
+        if ratio > 1 + threshold and current["median_ms"] - base["median_ms"] > noise_floor_ms:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append((name, base["median_ms"], current["median_ms"], ratio, status))
+    return rows, regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--records", type=int, default=200, help="birth records in the corpus")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests for the API runs")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="delay added by the Prokerala mock")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed median slowdown vs the baseline, as a fraction")
+    parser.add_argument("--noise-floor-ms", type=float, default=0.05,
+                        help="slowdowns smaller than this many ms never fail")
+    parser.add_argument("--startup-budget-ms", type=float, default=3000,
+                        help="fail when the startup.ready median exceeds this")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    for suite in suites:
+        if suite not in SUITES:
+            parser.error(f"unknown suite: {suite}")
+    # The API app starts no batch pool when driven through ASGITransport; keep it small anyway
+    os.environ.setdefault("KUNDLI_POOL_WORKERS", "1")
+    recs = records(args.records)
+    results = {}
+    if "stages" in suites:
+        results.update(bench_stages(recs))
+    if "calc" in suites:
+        results.update(bench_calc(recs))
+    if "api" in suites:
+        results.update(bench_api(recs, args.concurrency, args.upstream_latency_ms / 1000))
+    if "startup" in suites:
+        results.update(bench_startup())
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "records": args.records,
+            "seed": SEED,
+            "suites": suites,
+        },
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:40s} median {result['median_ms']:10.3f} ms   p95 {result['p95_ms']:10.3f} ms"
+              f"   {result['ops_per_sec'] or 0:10.1f} ops/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    over_budget = "startup.ready" in results and results["startup.ready"]["median_ms"] > args.startup_budget_ms
+    if over_budget:
+        print(f"\nstartup.ready is over the {args.startup_budget_ms:.0f} ms startup budget")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressed = compare(results, baseline, args.threshold, args.noise_floor_ms)
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        for name, base, current, ratio, status in rows:
+            print(f"{name:40s} {base:10.3f} ms -> {current:10.3f} ms  x{ratio:5.2f}  {status}")
+        return 1 if regressed or over_budget else 0
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
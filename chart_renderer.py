@@ -0,0 +1,144 @@
+from html import escape
+from kundli_calculator import RASHIS
+from vargas import VARGAS
+
+STYLES = ("north-indian", "south-indian", "east-indian")
+
+# chart_type names accepted by /chart (Prokerala's names) -> varga; D-codes work too
+CHART_TYPES = {title.lower(): varga for varga, (title, _) in VARGAS.items()}
+CHART_TYPES.update({"lagna": "D1", **{varga.lower(): varga for varga in VARGAS}})
+
+# Prokerala chart types this renderer cannot draw yet: chalit places planets by house cusps
+UNSUPPORTED_CHART_TYPES = {"chalit": "Bhava Chalit needs house-cusp placement, which is not implemented"}
+
+# Kundli body names -> chart labels
+ABBREVIATIONS = {
+    "Ascendant": "Asc", "Sun": "Su", "Moon": "Mo", "Mars": "Ma", "Mercury": "Me", "Jupiter": "Ju",
+    "Venus": "Ve", "Saturn": "Sa", "true Node": "Ra", "Ketu": "Ke",
+}
+
+SIZE = 400
+LINE_HEIGHT = 14
+LABELS_PER_LINE = 3
+
+def _svg_open(title):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SIZE} {SIZE + 24}" '
+            f'width="{SIZE}" height="{SIZE + 24}" font-family="sans-serif" font-size="12">'
+            f'<rect width="{SIZE}" height="{SIZE + 24}" fill="#fff"/>'
+            f'<text x="{SIZE / 2}" y="{SIZE + 17}" text-anchor="middle" font-size="13">{title}</text>')
+
+def _lines(points):
+    return "".join(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"/>' for x1, y1, x2, y2 in points)
+
+# Every style is a fixed frame plus 12 text slots. Frames are built once here; a render
+# only writes the placements. Slots are (x, y) centres: indexed by house (0 = lagna) in
+# the north-indian style and by sign (0 = Aries) in the others.
+S, H, Q = SIZE, SIZE / 2, SIZE / 4
+
+NORTH_FRAME = (
+    f'<g stroke="#333" stroke-width="1.5" fill="none"><rect x="1" y="1" width="{S - 2}" height="{S - 2}"/>'
+    + _lines([(0, 0, S, S), (S, 0, 0, S), (H, 0, S, H), (S, H, H, S), (H, S, 0, H), (0, H, H, 0)])
+    + "</g>"
+)
+NORTH_SLOTS = [
+    (H, Q), (Q, Q / 2), (Q / 2, Q), (Q, H), (Q / 2, 3 * Q), (Q, S - Q / 2),
+    (H, 3 * Q), (3 * Q, S - Q / 2), (S - Q / 2, 3 * Q), (3 * Q, H), (S - Q / 2, Q), (3 * Q, Q / 2),
+]
+# Sign numbers sit near each house's inner corner
+NORTH_NUMBERS = [
+    (H, H - 18), (Q, Q - 26), (Q - 26, Q), (H - 18, H), (Q - 26, 3 * Q), (Q, 3 * Q + 26),
+    (H, H + 26), (3 * Q, 3 * Q + 26), (3 * Q + 26, 3 * Q), (H + 18, H), (3 * Q + 26, Q), (3 * Q, Q - 26),
+]
+
+# South-indian: fixed signs clockwise around a 4x4 ring from Pisces at the top left
+SOUTH_CELLS = [(1, 0), (2, 0), (3, 0), (3, 1), (3, 2), (3, 3), (2, 3), (1, 3), (0, 3), (0, 2), (0, 1), (0, 0)]
+SOUTH_FRAME = (
+    f'<g stroke="#333" stroke-width="1.5" fill="none"><rect x="1" y="1" width="{S - 2}" height="{S - 2}"/>'
+    + _lines([(Q, 0, Q, S), (3 * Q, 0, 3 * Q, S), (0, Q, S, Q), (0, 3 * Q, S, 3 * Q),
+              (H, 0, H, Q), (H, 3 * Q, H, S), (0, H, Q, H), (3 * Q, H, S, H)])
+    + "</g>"
+)
+SOUTH_SLOTS = [(col * Q + Q / 2, row * Q + Q / 2) for col, row in SOUTH_CELLS]
+
+# East-indian: fixed signs anticlockwise from Aries at the top centre of a 3x3 grid;
+# each corner cell is split by its diagonal into two signs
+T = S / 3
+EAST_FRAME = (
+    f'<g stroke="#333" stroke-width="1.5" fill="none"><rect x="1" y="1" width="{S - 2}" height="{S - 2}"/>'
+    + _lines([(T, 0, T, S), (2 * T, 0, 2 * T, S), (0, T, S, T), (0, 2 * T, S, 2 * T),
+              (0, 0, T, T), (S, 0, 2 * T, T), (0, S, T, 2 * T), (S, S, 2 * T, 2 * T)])
+    + "</g>"
+)
+EAST_SLOTS = [
+    (H, T / 2),                                              # Aries
+    (2 * T / 3, T / 3), (T / 3, 2 * T / 3),                  # Taurus, Gemini (top left)
+    (T / 2, H),                                              # Cancer
+    (T / 3, S - 2 * T / 3), (2 * T / 3, S - T / 3),          # Leo, Virgo (bottom left)
+    (H, S - T / 2),                                          # Libra
+    (S - 2 * T / 3, S - T / 3), (S - T / 3, S - 2 * T / 3),  # Scorpio, Sagittarius (bottom right)
+    (S - T / 2, H),                                          # Capricorn
+    (S - T / 3, 2 * T / 3), (S - 2 * T / 3, T / 3),          # Aquarius, Pisces (top right)
+]
+
+def _text(x, y, content, **attrs):
+    extra = "".join(f' {name.replace("_", "-")}="{value}"' for name, value in attrs.items())
+    return f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="middle"{extra}>{content}</text>'
+
+def _stack(x, y, labels):
+    # Labels centred on (x, y), LABELS_PER_LINE to a line
+    rows = [" ".join(labels[i:i + LABELS_PER_LINE]) for i in range(0, len(labels), LABELS_PER_LINE)]
+    top = y - (len(rows) - 1) * LINE_HEIGHT / 2 + 4
+    return "".join(_text(x, top + i * LINE_HEIGHT, escape(row)) for i, row in enumerate(rows))
+
+def render_svg(lagna_sign: int, placements, style: str = "north-indian", title: str = ""):
+    """SVG chart from sign indices (0 = Aries).
+
+    placements maps sign index -> list of labels in that sign. The north-indian frame is
+    rotated so lagna_sign is house 1; the fixed-sign styles show the lagna through its
+    "Asc" label.
+    """
+    title = escape(title)
+    parts = [_svg_open(title)]
+    if style == "north-indian":
+        parts.append(NORTH_FRAME)
+        for house in range(12):
+            sign = (lagna_sign + house) % 12
+            x, y = NORTH_NUMBERS[house]
+            parts.append(_text(x, y + 4, sign + 1, fill="#888", font_size="11"))
+            if placements.get(sign):
+                parts.append(_stack(*NORTH_SLOTS[house], placements[sign]))
+    elif style in ("south-indian", "east-indian"):
+        parts.append(SOUTH_FRAME if style == "south-indian" else EAST_FRAME)
+        slots = SOUTH_SLOTS if style == "south-indian" else EAST_SLOTS
+        for sign in range(12):
+            if placements.get(sign):
+                parts.append(_stack(*slots[sign], placements[sign]))
+        if style == "south-indian":
+            parts.append(_text(H, H + 5, title, font_size="14"))
+    else:
+        raise ValueError(f"Unknown chart style: {style} (expected one of {', '.join(STYLES)})")
+    parts.append("</svg>")
+    return "".join(parts)
+
+def chart_varga(chart_type: str):
+    if chart_type.lower() in UNSUPPORTED_CHART_TYPES:
+        raise ValueError(f"Unsupported chart type: {chart_type} ({UNSUPPORTED_CHART_TYPES[chart_type.lower()]})")
+    varga = CHART_TYPES.get(chart_type.lower())
+    if varga is None:
+        raise ValueError(f"Unknown chart type: {chart_type}")
+    return varga
+
+def render_kundli_chart(kundli, chart_type: str = "rasi", style: str = "north-indian"):
+    # kundli needs the divisional_charts section; planets (when present) adds retrograde marks
+    varga = chart_varga(chart_type)
+    signs = kundli["divisional_charts"][varga]
+    retrograde = {p["name"] for p in kundli.get("planets") or () if p.get("retrograde")}
+    lagna_sign = RASHIS.index(signs["Ascendant"])
+    placements = {}
+    for body, sign in signs.items():
+        label = ABBREVIATIONS.get(body, body[:2])
+        if body in retrograde:
+            label += "(R)"
+        placements.setdefault(RASHIS.index(sign), []).append(label)
+    title = f"{VARGAS[varga][0]} ({varga})"
+    return render_svg(lagna_sign, placements, style, title)
@@ -0,0 +1,113 @@
+from bisect import bisect_right
+from itertools import accumulate
+import ephemeris
+
+# Vimshottari sequence and mahadasha lengths in years (total 120)
+DASHA_LORDS = ["Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury"]
+DASHA_YEARS = [7, 20, 6, 10, 7, 18, 16, 19, 17]
+TOTAL_YEARS = 120
+YEAR_DAYS = 365.25
+LEVELS = ["mahadasha", "antardasha", "pratyantardasha", "sookshma", "prana"]
+MAX_DEPTH = len(LEVELS)
+
+# Sub-periods of a period ruled by lord L run through the sequence starting at L, each
+# taking years[sub] / 120 of the parent. SUB_LORDS[L] and SUB_BOUNDS[L] (cumulative
+# fractions, 10 entries from 0 to 1) are shared by every period of every chart.
+SUB_LORDS = [[(lord + k) % 9 for k in range(9)] for lord in range(9)]
+SUB_BOUNDS = [
+    [0.0] + [b / TOTAL_YEARS for b in accumulate(DASHA_YEARS[l] for l in SUB_LORDS[lord])]
+    for lord in range(9)
+]
+
+class DashaPeriod:
+    __slots__ = ("lord", "start", "end", "level")
+
+    def __init__(self, lord: int, start: float, end: float, level: int):
+        self.lord = lord
+        self.start = start
+        self.end = end
+        self.level = level
+
+    def children(self):
+        # Computed on demand; nothing below a period exists until it is asked for
+        duration = self.end - self.start
+        bounds = SUB_BOUNDS[self.lord]
+        return [
+            DashaPeriod(sub, self.start + bounds[k] * duration, self.start + bounds[k + 1] * duration, self.level + 1)
+            for k, sub in enumerate(SUB_LORDS[self.lord])
+        ]
+
+    def child_at(self, jd: float):
+        # The one sub-period containing jd, by binary search over the shared bounds table
+        duration = self.end - self.start
+        bounds = SUB_BOUNDS[self.lord]
+        k = min(max(bisect_right(bounds, (jd - self.start) / duration) - 1, 0), 8)
+        return DashaPeriod(SUB_LORDS[self.lord][k], self.start + bounds[k] * duration,
+                           self.start + bounds[k + 1] * duration, self.level + 1)
+
+    def to_dict(self, depth: int = 1):
+        period = {
+            "lord": DASHA_LORDS[self.lord],
+            "level": LEVELS[self.level],
+            "start": ephemeris.jd_to_iso(self.start),
+            "end": ephemeris.jd_to_iso(self.end),
+        }
+        if depth > 1:
+            period["periods"] = [child.to_dict(depth - 1) for child in self.children()]
+        return period
+
+class VimshottariDasha:
+    """Vimshottari dasha timeline of one chart, kept as (birth lord, cycle start) only.
+
+    Periods are produced lazily: children() expands one period, active_at() walks straight
+    down to the periods containing an instant without building the rest of the tree.
+    """
+
+    def __init__(self, moon_sidereal: float, birth_jd: float):
+        nakshatra_pos = (moon_sidereal % 360) / ephemeris.NAKSHATRA_SPAN
+        nakshatra = int(nakshatra_pos)
+        self.birth_jd = birth_jd
+        self.birth_lord = nakshatra % 9
+        elapsed = nakshatra_pos - nakshatra
+        birth_years = DASHA_YEARS[self.birth_lord]
+        self.balance_years = (1 - elapsed) * birth_years
+        # The first mahadasha started before birth; the 120-year cycle starts with it
+        self.cycle_start = birth_jd - elapsed * birth_years * YEAR_DAYS
+        self.cycle_days = TOTAL_YEARS * YEAR_DAYS
+
+    def _cycle(self, jd: float):
+        n = int((jd - self.cycle_start) // self.cycle_days)
+        start = self.cycle_start + max(n, 0) * self.cycle_days
+        # A pseudo-period one level above the mahadashas, ruled by the birth lord
+        return DashaPeriod(self.birth_lord, start, start + self.cycle_days, -1)
+
+    def mahadashas(self):
+        return self._cycle(self.birth_jd).children()
+
+    def active_at(self, jd: float, depth: int = 3):
+        period = self._cycle(jd)
+        path = []
+        for _ in range(min(depth, MAX_DEPTH)):
+            period = period.child_at(jd)
+            path.append(period)
+        return path
+
+    def find(self, lords):
+        # Period reached by following lord names down from the mahadashas, e.g. ["Venus", "Sun"]
+        if not 1 <= len(lords) <= MAX_DEPTH:
+            raise ValueError(f"A dasha path names 1 to {MAX_DEPTH} lords ({', '.join(LEVELS)}), not {len(lords)}")
+        period = self._cycle(self.birth_jd)
+        for name in lords:
+            matches = [child for child in period.children() if DASHA_LORDS[child.lord] == name]
+            if not matches:
+                raise ValueError(f"Unknown dasha lord: {name}")
+            period = matches[0]
+        return period
+
+    def summary(self):
+        return {
+            "system": "Vimshottari",
+            "birth_lord": DASHA_LORDS[self.birth_lord],
+            "balance_years": self.balance_years,
+            "mahadashas": [period.to_dict() for period in self.mahadashas()],
+        }
@@ -0,0 +1,242 @@
+import math
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import swisseph as swe
+import ephemeris
+import panchang
+from timezones import zone
+from kundli_calculator import COMBUST_BODIES, KARANAS, NAKSHATRAS, RASHIS, RETROGRADE_BODIES, TITHIS, YOGAS
+from transits import BODIES, DEFAULT_STEP_DAYS, STEP_DAYS
+
+MAX_DAYS = 366 * 2
+
+# Transit bodies by name: (swisseph id, longitude offset)
+BODY_IDS = {name: (planet, offset) for name, planet, offset in BODIES}
+
+# The ascendant is sampled at half the shortest time any 30 degrees of the ecliptic take
+# to rise at the site's latitude. That time falls towards zero at the polar circles,
+# where parts of the ecliptic never rise; ascendant searches stop short of them.
+MAX_ASCENDANT_LATITUDE = 66.0
+ASCENDANT_STEP_FRACTION = 0.5
+OBLIQUITY = 23.44
+SIDEREAL_DEGREES_PER_DAY = 360.98565
+
+class UnsupportedLatitude(ValueError):
+    pass
+
+@lru_cache(maxsize=1024)
+def shortest_sign_rise_days(lat: float):
+    """Shortest time, in days, for any 30-degree span of the ecliptic to rise at lat.
+
+    From the oblique ascension of ecliptic longitudes sampled every 0.05 degrees;
+    symmetric in the sign of lat.
+    """
+    if abs(lat) > MAX_ASCENDANT_LATITUDE:
+        raise UnsupportedLatitude(
+            f"Ascendant constraints are supported up to latitude {MAX_ASCENDANT_LATITUDE} (got {lat})")
+    eps = math.radians(OBLIQUITY)
+    lam = np.radians(np.arange(0, 360, 0.05))
+    right_ascension = np.arctan2(np.sin(lam) * math.cos(eps), np.cos(lam))
+    declination = np.arcsin(math.sin(eps) * np.sin(lam))
+    oblique = np.degrees(np.unwrap(right_ascension - np.arcsin(math.tan(math.radians(abs(lat))) * np.tan(declination))))
+    oblique = np.concatenate([oblique, oblique + 360])
+    span = round(30 / 0.05)
+    return float((oblique[span:span + len(lam)] - oblique[:len(lam)]).min()) / SIDEREAL_DEGREES_PER_DAY
+
+# Named quantities: lower-case name -> index into the kundli tables
+LABELS = {"nakshatra": NAKSHATRAS, "sign": RASHIS, "ascendant": RASHIS, "yoga": YOGAS, "karana": KARANAS}
+NAME_INDEX = {quantity: {name.lower(): i for i, name in enumerate(labels)} for quantity, labels in LABELS.items()}
+TITHI_INDEX = {name.lower(): i for i, name in enumerate(TITHIS)}
+
+# Quantity -> body handling: the default body, "required", or None (not per body)
+QUANTITY_BODIES = {
+    "nakshatra": "Moon",
+    "sign": "Moon",
+    "retrograde": "required",
+    "combust": "required",
+    "tithi": None,
+    "yoga": None,
+    "karana": None,
+    "ascendant": None,
+}
+
+def _body_state(jds, body):
+    # Sidereal longitude and daily speed of a transit body at each jd
+    planet, offset = BODY_IDS[body]
+    pos = ephemeris.planet_positions(jds, planets=(planet,))[:, 0]
+    return ephemeris.sidereal(pos[:, ephemeris.LON] + offset, ephemeris.ayanamsha(jds)), pos[:, ephemeris.SPEED]
+
+def _luminaries(jds):
+    pos = ephemeris.planet_positions(jds, planets=ephemeris.LUMINARIES)
+    ayan = ephemeris.ayanamsha(jds)
+    return ephemeris.sidereal(pos[:, 0, ephemeris.LON], ayan), ephemeris.sidereal(pos[:, 1, ephemeris.LON], ayan)
+
+def _ascendant_sign(jds, lat, lon):
+    ascendants = [swe.houses(jd, lat, lon, b'A')[1][0] for jd in jds.tolist()]
+    return ephemeris.sign_index(ephemeris.sidereal(ascendants, ephemeris.ayanamsha(jds)))
+
+def _tithi_values(value):
+    # Tithi number 1-30, tithi name (either paksha) or a paksha name -> tithi indices
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not 1 <= value <= 30:
+            raise ValueError(f"Tithi number out of range: {value}")
+        return [value - 1]
+    name = str(value).lower()
+    if name in ("shukla", "krishna"):
+        start = 0 if name == "shukla" else 15
+        return list(range(start, start + 15))
+    if name == "purnima":
+        return [14]
+    if name == "amavasya":
+        return [29]
+    if name in TITHI_INDEX:
+        return [TITHI_INDEX[name], TITHI_INDEX[name] + 15]
+    raise ValueError(f"Unknown tithi: {value}")
+
+class Constraint:
+    """One condition of an electional search: quantity (of body) is one of values,
+    or none of them with negate.
+
+    holds() evaluates it on an array of Julian days; windows() returns the intervals
+    of a range where it holds, from a grid of step days refined at every change.
+    """
+
+    def __init__(self, quantity: str, values, body: str = None, negate: bool = False, site=None):
+        if quantity not in QUANTITY_BODIES:
+            raise ValueError(f"Unknown quantity: {quantity} (expected one of {', '.join(QUANTITY_BODIES)})")
+        default_body = QUANTITY_BODIES[quantity]
+        if default_body is None and body is not None:
+            raise ValueError(f"{quantity} is not a per-body quantity")
+        if body is None and default_body == "required":
+            raise ValueError(f"{quantity} needs a body")
+        body = body if body is not None else default_body
+        if body is not None and body not in BODY_IDS:
+            raise ValueError(f"Unknown body: {body} (expected one of {', '.join(BODY_IDS)})")
+        if quantity == "retrograde" and body not in RETROGRADE_BODIES:
+            # As in the kundli planets section: the luminaries never are, and the true
+            # node's speed changes sign too often to mean anything
+            raise ValueError(f"retrograde applies to {', '.join(sorted(RETROGRADE_BODIES))}, not {body}")
+        if quantity == "ascendant" and site is None:
+            raise ValueError("ascendant needs a location")
+        if not values:
+            raise ValueError(f"No values given for {quantity}")
+        self.quantity = quantity
+        self.body = body
+        self.negate = negate
+        self.site = site
+        if quantity in ("retrograde", "combust"):
+            size, indices = 2, [int(self._flag(value)) for value in values]
+        elif quantity == "tithi":
+            size, indices = 30, [index for value in values for index in _tithi_values(value)]
+        else:
+            size, indices = len(LABELS[quantity]), [self._label(value) for value in values]
+        # Lookup table: quantity index -> whether the constraint holds
+        self.allowed = np.zeros(size, dtype=bool)
+        self.allowed[indices] = True
+        if negate:
+            self.allowed = ~self.allowed
+        if quantity == "ascendant":
+            self.step = shortest_sign_rise_days(site[0]) * ASCENDANT_STEP_FRACTION
+        elif quantity in ("tithi", "yoga", "karana"):
+            self.step = panchang.GRID_STEP_DAYS
+        else:
+            self.step = STEP_DAYS.get(body, DEFAULT_STEP_DAYS)
+
+    def _flag(self, value):
+        if not isinstance(value, bool):
+            raise ValueError(f"{self.quantity} values are true or false, not {value!r}")
+        return value
+
+    def _label(self, value):
+        index = NAME_INDEX[self.quantity].get(str(value).lower())
+        if index is None:
+            raise ValueError(f"Unknown {self.quantity}: {value}")
+        return index
+
+    def index(self, jds):
+        # Value of the quantity at each jd, as an index into its labels (0/1 for flags)
+        jds = ephemeris.julian_days(jds)
+        if self.quantity == "ascendant":
+            return _ascendant_sign(jds, *self.site)
+        if self.quantity in ("tithi", "yoga", "karana"):
+            sun, moon = _luminaries(jds)
+            return getattr(ephemeris, f"{self.quantity}_index")(moon, sun)
+        lon, speed = _body_state(jds, self.body)
+        if self.quantity == "nakshatra":
+            return ephemeris.nakshatra_index(lon)
+        if self.quantity == "sign":
+            return ephemeris.sign_index(lon)
+        if self.quantity == "retrograde":
+            return (speed < 0).astype(np.int8)
+        # Combust: within 8 degrees of the Sun, as in the kundli planets section
+        if self.body not in COMBUST_BODIES:
+            return np.zeros(len(jds), dtype=np.int8)
+        sun, _ = _body_state(jds, "Sun")
+        return (np.abs(ephemeris.wrap(lon - sun)) < 8).astype(np.int8)
+
+    def holds(self, jds):
+        return self.allowed[self.index(jds)]
+
+    def windows(self, start_jd, end_jd):
+        """(start_jd, end_jd) intervals of [start_jd, end_jd) where the constraint holds.
+
+        Assumes the quantity changes at most once per step, so a match shorter than
+        the step can be missed; the steps follow the fastest motion of each quantity.
+        """
+        steps = max(1, math.ceil((end_jd - start_jd) / self.step))
+        grid = np.linspace(start_jd, end_jd, steps + 1)
+        inside = self.holds(grid)
+        changes = np.nonzero(inside[1:] != inside[:-1])[0]
+        edges = self._bisect(grid[changes], grid[changes + 1], inside[changes])
+        points = ([start_jd] if inside[0] else []) + edges + ([end_jd] if inside[-1] else [])
+        return list(zip(points[::2], points[1::2]))
+
+    def _bisect(self, lo, hi, lo_inside):
+        # All brackets at once: one ephemeris pass per halving instead of one per boundary
+        while len(lo) and (hi - lo).max() > ephemeris.TOLERANCE_DAYS:
+            mid = (lo + hi) / 2
+            same = self.holds(mid) == lo_inside
+            lo = np.where(same, mid, lo)
+            hi = np.where(same, hi, mid)
+        return ((lo + hi) / 2).tolist()
+
+def find_windows(start_jd, end_jd, constraints):
+    """Intervals of [start_jd, end_jd) where every constraint holds, as (start, end) jds.
+
+    Constraints are applied coarsest grid first, each one sampling only the windows
+    that survived the ones before it: the fine-grained constraints (the ascendant,
+    the Moon) usually see a small fraction of the range, and an empty intersection
+    stops the search early.
+    """
+    windows = [(start_jd, end_jd)]
+    for constraint in sorted(constraints, key=lambda c: -c.step):
+        windows = [window for a, b in windows for window in constraint.windows(a, b)]
+        if not windows:
+            break
+    return windows
+
+def search(lat, lon, timezone_str, start_date: str, days: int, constraints):
+    """Matching windows from local midnight on start_date (YYYY-MM-DD) for days days.
+
+    constraints: dicts with quantity, values and optionally body and negate (see
+    Constraint). Times are local ISO strings in timezone_str.
+    """
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+    site = (lat, lon)
+    compiled = [Constraint(site=site, **constraint) for constraint in constraints]
+    first = datetime.strptime(start_date, "%Y-%m-%d")
+    start_jd = ephemeris.local_midnight_jd(timezone_str, start_date)
+    end_jd = ephemeris.local_midnight_jd(timezone_str, (first + timedelta(days=days)).strftime("%Y-%m-%d"))
+    tz = zone(timezone_str)
+    results = []
+    for a, b in find_windows(start_jd, end_jd, compiled):
+        start, end = ephemeris.jd_to_datetime(a).astimezone(tz), ephemeris.jd_to_datetime(b).astimezone(tz)
+        if end > start:
+            results.append({
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "duration_hours": (end - start).total_seconds() / 3600,
+            })
+    return results
@@ -0,0 +1,204 @@
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+import swisseph as swe
+from datetime import datetime, timedelta, timezone
+from timezones import localize, zone
+
+# Directory (or ':'-separated list) holding the Swiss Ephemeris .se1 files. Without them
+# swisseph silently falls back to its built-in Moshier ephemeris.
+EPHE_PATH = os.getenv("SE_EPHE_PATH", "")
+
+# swisseph keeps its settings per thread, so each thread applies them before its first
+# calculation (ensure_configured) and again after configure() changes them
+_settings = {"ephe_path": EPHE_PATH, "version": 0}
+_thread = threading.local()
+
+def configure(ephe_path: str = None):
+    if ephe_path is not None:
+        _settings["ephe_path"] = ephe_path
+    _settings["version"] += 1
+    ensure_configured()
+
+def ensure_configured():
+    if getattr(_thread, "version", None) != _settings["version"]:
+        swe.set_ephe_path(_settings["ephe_path"])
+        # Every sidereal value (ayanamsha, signs, nakshatras, vargas) is Lahiri
+        swe.set_sid_mode(swe.SIDM_LAHIRI)
+        _thread.version = _settings["version"]
+
+# Order used for the planet axis of every array returned by this module
+PLANETS = (swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN, swe.TRUE_NODE)
+PLANET_NAMES = tuple(swe.get_planet_name(p) for p in PLANETS)
+LUMINARIES = (swe.SUN, swe.MOON)
+
+NAKSHATRA_SPAN = 360 / 27
+PADA_SPAN = NAKSHATRA_SPAN / 4
+
+LON, SPEED = 0, 1
+
+J2000 = datetime(2000, 1, 1, 12, tzinfo=timezone.utc)
+J2000_JD = 2451545.0
+
+# Root refinement stops once the bracket is narrower than this (about one second)
+TOLERANCE_DAYS = 1.0 / 86400
+
+def jd_to_datetime(jd):
+    # UT Julian day -> aware UTC datetime, rounded to the second
+    return J2000 + timedelta(seconds=round((jd - J2000_JD) * 86400))
+
+def datetime_to_jd(dt):
+    return J2000_JD + (dt - J2000).total_seconds() / 86400
+
+def jd_to_iso(jd):
+    return jd_to_datetime(jd).isoformat()
+
+def local_midnight_jd(timezone_str, day):
+    # UT Julian day of 00:00 local time on day (YYYY-MM-DD)
+    local = localize(zone(timezone_str), datetime.strptime(day, "%Y-%m-%d"))
+    return datetime_to_jd(local.astimezone(timezone.utc))
+
+def jd_to_local(jd, timezone_str):
+    return jd_to_datetime(jd).astimezone(zone(timezone_str))
+
+@lru_cache(maxsize=65536)
+def sunrise_sunset(lat, lon, timezone_str, day):
+    # UT Julian days of sunrise and sunset (upper limb, with refraction) on the local
+    # calendar day; None when the Sun does not rise or set that day. Cached per
+    # (location, day): calendars and kundlis for the same city and date share the search.
+    start = local_midnight_jd(timezone_str, day)
+    end = local_midnight_jd(timezone_str, (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+    geopos = (lon, lat, 0.0)
+    ensure_configured()
+    events = []
+    for rsmi in (swe.CALC_RISE, swe.CALC_SET):
+        res, tret = swe.rise_trans(start, swe.SUN, rsmi, geopos)
+        events.append(tret[0] if res == 0 and tret[0] < end else None)
+    return tuple(events)
+
+def warm_up(jd: float = 2451545.0):
+    # First touch of the ephemeris files and swisseph's internal tables, so the first
+    # request does not pay for it
+    ensure_configured()
+    for planet in PLANETS:
+        swe.calc_ut(jd, planet, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    swe.get_ayanamsa(jd)
+    swe.houses(jd, 0.0, 0.0, b'A')
+    swe.rise_trans(jd, swe.SUN, swe.CALC_RISE, (0.0, 0.0, 0.0))
+
+def julian_days(jds):
+    return np.atleast_1d(np.asarray(jds, dtype=float))
+
+def wrap(deg):
+    # Signed angle in [-180, 180)
+    return (deg + 180.0) % 360.0 - 180.0
+
+def find_root(f, a, b, fa, fb, tolerance=TOLERANCE_DAYS):
+    # Illinois variant of regula falsi: f(a) and f(b) have opposite signs. Stops when the
+    # bracket or the step between successive estimates is below tolerance.
+    side = 0
+    t = None
+    while b - a > tolerance:
+        previous = t
+        t = (a * fb - b * fa) / (fb - fa)
+        if not a < t < b:
+            t = (a + b) / 2
+        if previous is not None and abs(t - previous) < tolerance:
+            return t
+        ft = f(t)
+        if ft == 0:
+            return t
+        if (ft > 0) == (fb > 0):
+            b, fb = t, ft
+            if side == -1:
+                fa /= 2
+            side = -1
+        else:
+            a, fa = t, ft
+            if side == 1:
+                fb /= 2
+            side = 1
+    return (a + b) / 2
+
+def planet_positions(jds, planets=PLANETS, flags=swe.FLG_SWIEPH | swe.FLG_SPEED):
+    # (N, len(planets), 2) array of tropical [longitude, daily speed in longitude].
+    # One calc_ut per (day, planet): the speed comes back with the longitude, so
+    # retrograde checks need no second query.
+    ensure_configured()
+    jd_list = julian_days(jds).tolist()
+    out = np.empty((len(jd_list), len(planets), 2))
+    calc_ut = swe.calc_ut
+    for j, planet in enumerate(planets):
+        rows = [calc_ut(jd, planet, flags)[0] for jd in jd_list]
+        out[:, j, LON] = [r[0] for r in rows]
+        out[:, j, SPEED] = [r[3] for r in rows]
+    return out
+
+def ayanamsha(jds):
+    ensure_configured()
+    get_ayanamsa = swe.get_ayanamsa
+    return np.array([get_ayanamsa(jd) for jd in julian_days(jds).tolist()])
+
+def sidereal(longitudes, ayanamsha_values):
+    # Broadcasts (N,) ayanamsha over (N,) or (N, planets) longitudes
+    ayanamsha_values = np.asarray(ayanamsha_values)
+    if np.ndim(longitudes) == 2:
+        ayanamsha_values = ayanamsha_values[:, None]
+    return np.mod(np.asarray(longitudes) - ayanamsha_values, 360)
+
+def sign_index(longitudes):
+    return (np.mod(longitudes, 360) // 30).astype(np.int8)
+
+def nakshatra_index(longitudes):
+    return (np.mod(longitudes, 360) // NAKSHATRA_SPAN).astype(np.int8)
+
+def pada_index(longitudes):
+    return (np.mod(longitudes, NAKSHATRA_SPAN) // PADA_SPAN).astype(np.int8)
+
+def elongation(moon_sidereal, sun_sidereal):
+    return np.mod(np.asarray(moon_sidereal) - sun_sidereal, 360)
+
+def tithi_index(moon_sidereal, sun_sidereal):
+    # 0..29; 0-14 Shukla paksha, 15-29 Krishna paksha
+    return (elongation(moon_sidereal, sun_sidereal) // 12).astype(np.int8)
+
+def yoga_index(moon_sidereal, sun_sidereal):
+    return (np.mod(np.asarray(moon_sidereal) + sun_sidereal, 360) // NAKSHATRA_SPAN).astype(np.int8)
+
+def half_tithi_index(moon_sidereal, sun_sidereal):
+    return (elongation(moon_sidereal, sun_sidereal) // 6).astype(np.int8)
+
+def karana_index(moon_sidereal, sun_sidereal):
+    return karana_of_half_tithi(half_tithi_index(moon_sidereal, sun_sidereal))
+
+def karana_of_half_tithi(half):
+    # Index into the 11 karanas (Bava..Vishti, Shakuni, Chatushpada, Naga, Kimstughna).
+    # Half-tithi 0 is Kimstughna, 1-56 cycle through the seven movable karanas,
+    # 57-59 are Shakuni, Chatushpada and Naga.
+    half = np.asarray(half).astype(np.int16)
+    movable = (half - 1) % 7
+    fixed = half - 50
+    return np.where(half == 0, 10, np.where(half >= 57, fixed, movable)).astype(np.int8)
+
+def chart_arrays(jds, planets=PLANETS):
+    # Everything calculate_kundli derives from the ephemeris alone, for N instants at once.
+    # planets must include the Sun and Moon; LUMINARIES is enough for panchang-only work.
+    jds = julian_days(jds)
+    positions = planet_positions(jds, planets)
+    ayan = ayanamsha(jds)
+    moon = sidereal(positions[:, planets.index(swe.MOON), LON], ayan)
+    sun = sidereal(positions[:, planets.index(swe.SUN), LON], ayan)
+    return {
+        "jd": jds,
+        "positions": positions,
+        "ayanamsha": ayan,
+        "moon_sidereal": moon,
+        "sun_sidereal": sun,
+        "moon_sign": sign_index(moon),
+        "nakshatra": nakshatra_index(moon),
+        "pada": pada_index(moon),
+        "tithi": tithi_index(moon, sun),
+        "yoga": yoga_index(moon, sun),
+        "karana": karana_index(moon, sun),
+    }
@@ -0,0 +1,102 @@
+import csv
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_place(place: str):
+    # "  New   Delhi , INDIA " and "new delhi,india" share one cache key
+    parts = [re.sub(r"\s+", " ", part).strip() for part in place.lower().split(",")]
+    return ",".join(part for part in parts if part)
+
+
+class GeocodeCache:
+    """Place -> (lat, lon, timezone) lookup: an in-process LRU in front of a SQLite store.
+
+    With no db_path the SQLite store lives in memory and is lost on restart.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        if db_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            "key TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL, timezone TEXT NOT NULL)"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, place: str):
+        key = normalize_place(place)
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return value
+            row = self._db.execute(
+                "SELECT latitude, longitude, timezone FROM places WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value = (row[0], row[1], row[2])
+            self._remember(key, value)
+            self.disk_hits += 1
+            return value
+
+    def put(self, place: str, lat: float, lon: float, timezone_str: str):
+        key = normalize_place(place)
+        value = (lat, lon, timezone_str)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO places (key, latitude, longitude, timezone) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, timezone_str),
+            )
+            self._db.commit()
+            self._remember(key, value)
+
+    def load_gazetteer(self, path: str):
+        # CSV with a header row: place,latitude,longitude,timezone
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [
+                (normalize_place(r["place"]), float(r["latitude"]), float(r["longitude"]), r["timezone"].strip())
+                for r in csv.DictReader(f)
+                if r.get("place")
+            ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO places (key, latitude, longitude, timezone) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+            for key, *value in rows:
+                if key in self._lru:
+                    self._lru[key] = tuple(value)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stored = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._lru),
+                "stored_entries": stored,
+            }
@@ -0,0 +1,238 @@
+"""Bulk kundli ingestion: JSONL/CSV birth records -> JSONL or Parquet kundlis.
+
+    python ingest.py births.csv kundlis.jsonl --workers 8 --geocode-cache geocode.sqlite
+    python ingest.py births.jsonl kundlis.parquet --fields planets,panchang --resume
+
+Input rows need dob, tob and place, and may carry id and latitude/longitude[/timezone]
+(which skip geocoding). Records stream through in input order: places are geocoded in
+this process through the GeocodeCache, chunks are calculated in worker processes with a
+bounded number in flight, and results are appended as they complete. Progress is
+checkpointed every --checkpoint-every records; --resume continues an interrupted run.
+Parquet output is a directory of part files, one per checkpoint.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from geocode_cache import GeocodeCache
+from kundli_calculator import KundliCalculator, resolve_fields
+from kundli_pool import KundliPool
+from serialization import dumps_json
+
+def read_records(path):
+    # Streams dicts from a .csv or .jsonl file ("-" reads JSONL from stdin)
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class JsonlSink:
+    def __init__(self, path, checkpoint):
+        self.path = path
+        offset = checkpoint.get("output_bytes", 0) if checkpoint else 0
+        self.file = open(path, "r+b" if checkpoint and os.path.exists(path) else "wb")
+        # Anything written after the last checkpoint is rewritten by this run
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, rows):
+        self.file.write(b"".join(dumps_json(row) + b"\n" for row in rows))
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"output_bytes": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    def __init__(self, path, checkpoint):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        # kundli is a JSON string column: its nested sections vary with --fields
+        self.schema = pyarrow.schema([
+            ("id", pyarrow.string()), ("dob", pyarrow.string()), ("tob", pyarrow.string()),
+            ("place", pyarrow.string()), ("success", pyarrow.bool_()), ("error", pyarrow.string()),
+            ("kundli", pyarrow.string()),
+        ])
+        self.path = path
+        self.parts = checkpoint.get("parts", 0) if checkpoint else 0
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            # Parts (or temp files) from after the last checkpoint are rewritten
+            if name.startswith("part-") and (name.endswith(".tmp") or int(name[5:10]) >= self.parts):
+                os.remove(os.path.join(path, name))
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+
+    def commit(self):
+        if self.rows:
+            def text(value):
+                return None if value is None else str(value)
+            table = self.pa.table({
+                "id": [text(row["id"]) for row in self.rows],
+                "dob": [text(row["dob"]) for row in self.rows],
+                "tob": [text(row["tob"]) for row in self.rows],
+                "place": [text(row["place"]) for row in self.rows],
+                "success": [row["success"] for row in self.rows],
+                "error": [row.get("error") for row in self.rows],
+                "kundli": [dumps_json(row["kundli"]).decode("utf-8") if "kundli" in row else None for row in self.rows],
+            }, schema=self.schema)
+            final = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            self.pq.write_table(table, final + ".tmp")
+            os.replace(final + ".tmp", final)
+            self.parts += 1
+            self.rows = []
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path, state):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def prepare(calc, record, failed_places):
+    # -> (output row without result, pool item or None if the record already failed).
+    # failed_places (place -> error) holds the places that failed to geocode this run:
+    # the geocode cache only keeps successes, and every retry would be a Nominatim call
+    row = {"id": record.get("id"), "dob": record.get("dob"), "tob": record.get("tob"), "place": record.get("place")}
+    try:
+        if record.get("latitude") not in (None, "") and record.get("longitude") not in (None, ""):
+            location = calc.resolve_location(float(record["latitude"]), float(record["longitude"]),
+                                             record.get("timezone") or None)
+            row["place"] = row["place"] or f"{location[0]},{location[1]}"
+        elif row["place"] in failed_places:
+            row.update(success=False, error=failed_places[row["place"]])
+            return row, None
+        else:
+            try:
+                location = calc.geocode_place(row["place"])
+            except Exception as e:
+                failed_places[row["place"]] = str(e)
+                raise
+        return row, (row["dob"], row["tob"], row["place"], location)
+    except Exception as e:
+        row.update(success=False, error=str(e))
+        return row, None
+
+def run(args):
+    fields = resolve_fields(args.fields) if args.fields else None
+    checkpoint_path = args.checkpoint or args.output.rstrip("/") + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint and checkpoint.get("input") != args.input:
+        raise SystemExit(f"{checkpoint_path} belongs to {checkpoint.get('input')}, not {args.input}")
+    if not args.resume and os.path.exists(checkpoint_path):
+        raise SystemExit(f"{checkpoint_path} exists: pass --resume to continue that run, or delete it")
+    done = checkpoint["records_done"] if checkpoint else 0
+
+    geocode_cache = GeocodeCache(args.geocode_cache)
+    if args.gazetteer:
+        geocode_cache.load_gazetteer(args.gazetteer)
+    calc = KundliCalculator(geocode_cache=geocode_cache)
+    sink = (ParquetSink if args.output.endswith(".parquet") else JsonlSink)(args.output, checkpoint)
+    pool = KundliPool(args.workers, chunk_size=args.chunk_size).start()
+    state = dict(checkpoint or {}, input=args.input, records_done=done)
+    pending = deque()
+    failed_places = {}
+    since_checkpoint = 0
+    started = time.monotonic()
+    processed = 0
+
+    def drain_one():
+        nonlocal done, since_checkpoint, processed
+        rows, future = pending.popleft()
+        results = iter(future.result()) if future is not None else iter(())
+        for row in rows:
+            if "success" not in row:
+                row.update(next(results))
+        sink.write(rows)
+        done += len(rows)
+        processed += len(rows)
+        since_checkpoint += len(rows)
+        if since_checkpoint >= args.checkpoint_every:
+            commit()
+
+    def commit():
+        nonlocal since_checkpoint
+        state.update(sink.commit(), records_done=done)
+        save_checkpoint(checkpoint_path, state)
+        since_checkpoint = 0
+        elapsed = time.monotonic() - started
+        print(f"{done} records done ({processed / elapsed if elapsed else 0:.0f}/s this run, "
+              f"geocode {geocode_cache.stats()['hit_ratio']:.1%} cached)", file=sys.stderr)
+
+    try:
+        for chunk in chunked(islice(read_records(args.input), done, None), args.chunk_size):
+            prepared = [prepare(calc, record, failed_places) for record in chunk]
+            items = [item for _, item in prepared if item is not None]
+            future = pool.submit(items, fields) if items else None
+            pending.append(([row for row, _ in prepared], future))
+            # Bounded in-flight work: memory stays flat however large the input is
+            while len(pending) >= args.max_pending:
+                drain_one()
+        while pending:
+            drain_one()
+        commit()
+    finally:
+        sink.close()
+        pool.shutdown()
+    return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help=".csv or .jsonl birth records (- for JSONL on stdin)")
+    parser.add_argument("output", help=".jsonl file or .parquet directory")
+    parser.add_argument("--fields", help="comma-separated kundli sections (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="records per worker task")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="chunks in flight at once (default: 2 per worker)")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="records between checkpoints")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--geocode-cache", help="SQLite file that persists geocoding across runs")
+    parser.add_argument("--gazetteer", help="place,latitude,longitude,timezone CSV to preload")
+    args = parser.parse_args(argv)
+    if args.max_pending is None:
+        args.max_pending = 2 * (args.workers or os.cpu_count() or 1)
+    done = run(args)
+    print(f"finished: {done} records", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,277 @@
+import threading
+import time
+from array import array
 import swisseph as swe
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
 import pytz
 from datetime import datetime
+from geocode_cache import GeocodeCache
+from timezones import TimezoneResolver, local_to_utc
+import ephemeris
+import metrics
+from dasha import VimshottariDasha
+import vargas
+import yoga_rules
+
+RASHIS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
+]
+RASHI_LORDS = [
+    "Mars", "Venus", "Mercury", "Moon", "Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Saturn", "Jupiter"
+]
+NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashirsha", "Ardra", "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
+    "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha", "Uttara Ashadha", "Shravana", "Dhanishtha", "Shatabhisha",
+    "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
+]
+TITHIS = [
+    "Pratipada", "Dvitiya", "Tritiya", "Chaturthi", "Panchami", "Shashthi", "Saptami", "Ashtami", "Navami", "Dashami", "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Purnima/Amavasya"
+]
+YOGAS = [
+    "Vishkambha", "Priti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda", "Sukarman", "Dhriti", "Shoola", "Ganda", "Vriddhi", "Dhruva", "Vyaghata", "Harshana", "Vajra", "Siddhi", "Vyatipata", "Variyana", "Parigha", "Shiva", "Siddha", "Sadhya", "Shubha", "Shukla", "Brahma", "Indra", "Vaidhriti"
+]
+KARANAS = [
+    "Bava", "Balava", "Kaulava", "Taitila", "Garaja", "Vanija", "Vishti", "Shakuni", "Chatushpada", "Naga", "Kimstughna"
+]
+
+EXALTATION = {
+    "Sun": "Aries", "Moon": "Taurus", "Mars": "Capricorn", "Mercury": "Virgo", "Jupiter": "Cancer", "Venus": "Pisces", "Saturn": "Libra"
+}
+DEBILITATION = {
+    "Sun": "Libra", "Moon": "Scorpio", "Mars": "Cancer", "Mercury": "Pisces", "Jupiter": "Capricorn", "Venus": "Virgo", "Saturn": "Aries"
+}
+MOOLATRIKONA = {
+    "Sun": "Leo", "Moon": "Taurus", "Mars": "Aries", "Mercury": "Virgo", "Jupiter": "Sagittarius", "Venus": "Libra", "Saturn": "Aquarius"
+}
+
+# Degree aspects checked by _stage_aspects (2 degree orb), by aspecting planet
+SPECIAL_ASPECTS = {"Mars": (90, 180, 210), "Jupiter": (150, 180, 210), "Saturn": (90, 180, 270)}
+
+# Calculation stages: name -> (stages it depends on, KundliCalculator method)
+STAGES = {
+    "location": ((), "_stage_location"),
+    "julday": (("location",), "_stage_julday"),
+    "ephemeris": (("julday",), "_stage_ephemeris"),
+    "houses": (("julday",), "_stage_houses"),
+    "panchang": (("julday",), "_stage_panchang"),
+    "sunrise": (("location",), "_stage_sunrise"),
+    "planets": (("ephemeris", "houses"), "_stage_planets"),
+    "aspects": (("planets",), "_stage_aspects"),
+    "dasha": (("panchang",), "_stage_dasha"),
+    "transits": (("panchang",), "_stage_transits"),
+    "divisional_charts": (("ephemeris", "houses"), "_stage_divisional_charts"),
+    "yogas": (("ephemeris", "houses"), "_stage_yogas"),
+}
+
+# Kundli output keys (in response order) and the stage that produces each
+KUNDLI_FIELDS = {
+    "input": "location",
+    "ascendant": "houses",
+    "houses": "houses",
+    "planets": "planets",
+    "ayanamsha": "ephemeris",
+    "moon_sign": "panchang",
+    "nakshatra": "panchang",
+    "charan": "panchang",
+    "tithi": "panchang",
+    "yoga": "panchang",
+    "karana": "panchang",
+    "sunrise": "sunrise",
+    "sunset": "sunrise",
+    "aspects": "aspects",
+    "conjunctions": "aspects",
+    "yogas": "yogas",
+    "divisional_charts": "divisional_charts",
+    "dasha": "dasha",
+    "transits": "transits",
+}
+
+# Shorthand names accepted in fields= alongside the output keys themselves
+FIELD_GROUPS = {
+    "panchang": ("moon_sign", "nakshatra", "charan", "tithi", "yoga", "karana", "sunrise", "sunset"),
+}
+
+def resolve_fields(fields, transits_at=None):
+    # Accepts None or a blank string (every key), a comma-separated string or an iterable
+    # of names. transits describes transits_at, not the birth moment: the default set
+    # carries it empty when there is no such instant, and naming it then is an error.
+    if fields is None or (isinstance(fields, str) and not fields.strip()):
+        return list(KUNDLI_FIELDS)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    wanted = set()
+    for field in fields:
+        field = field.strip()
+        if not field:
+            continue
+        if field in FIELD_GROUPS:
+            wanted.update(FIELD_GROUPS[field])
+        elif field in KUNDLI_FIELDS:
+            wanted.add(field)
+        else:
+            raise ValueError(f"Unknown kundli field: {field}")
+    if not wanted:
+        raise ValueError("No kundli fields named")
+    if "transits" in wanted and transits_at is None:
+        raise ValueError("The transits section needs transits_at")
+    return [key for key in KUNDLI_FIELDS if key in wanted]
+
+# Helper for sign index
+def _get_sign(lon):
+    idx = int((lon % 360) // 30)
+    return RASHIS[idx], idx
+
+# Helper for house index
+def _get_house(lon, house_cusps):
+    diff = [(lon - c) % 360 for c in house_cusps]
+    min_diff = min(diff)
+    idx = diff.index(min_diff)
+    return idx+1
+
+# Helper for dignity
+def _get_dignity(planet, sign):
+    if planet in EXALTATION and sign == EXALTATION[planet]:
+        return "Exalted"
+    if planet in DEBILITATION and sign == DEBILITATION[planet]:
+        return "Debilitated"
+    if planet in MOOLATRIKONA and sign == MOOLATRIKONA[planet]:
+        return "Moolatrikona"
+    if planet in RASHI_LORDS and sign == planet:
+        return "Own Sign"
+    return "Neutral"
+
+DIGNITIES = ("Exalted", "Debilitated", "Moolatrikona", "Own Sign", "Neutral")
+
+# Body name -> dignity index (into DIGNITIES) for each sign, built once from _get_dignity
+PLANET_BODIES = ephemeris.PLANET_NAMES + ("Ketu",)
+DIGNITY_TABLE = {
+    planet: bytes(DIGNITIES.index(_get_dignity(planet, sign)) for sign in RASHIS) for planet in PLANET_BODIES
+}
+RETROGRADE_BODIES = frozenset(("Mars", "Mercury", "Jupiter", "Venus", "Saturn"))
+# Combustion is approximate: these bodies within 8 degrees of the Sun
+COMBUST_BODIES = frozenset(("Mercury", "Venus", "Mars", "Jupiter", "Saturn"))
+
+class PlanetTable:
+    """The planets section as columns: longitudes in a float array, signs, nakshatras and
+    dignities as indices into RASHIS, NAKSHATRAS and DIGNITIES.
+
+    Stages read the columns; the per-planet dicts of the response are only built by
+    to_dicts(), when planets is one of the requested fields.
+    """
+    __slots__ = ("names", "longitude", "sign", "house", "nakshatra", "pada", "dignity", "retrograde", "combust")
+
+    def __init__(self, positions, speeds, house_cusps):
+        self.names = names = tuple(positions)
+        self.longitude = lons = array("d", positions.values())
+        signs = [int((lon % 360) // 30) for lon in lons]
+        self.sign = array("b", signs)
+        self.house = array("b", [_get_house(lon, house_cusps) for lon in lons])
+        self.nakshatra = array("b", [int((lon % 360) // ephemeris.NAKSHATRA_SPAN) for lon in lons])
+        self.pada = array("b", [int(lon % ephemeris.NAKSHATRA_SPAN / ephemeris.PADA_SPAN + 1) for lon in lons])
+        self.dignity = array("b", [DIGNITY_TABLE[name][sign] for name, sign in zip(names, signs)])
+        # Retrograde from the speed that came back with the position; Sun and Moon never are
+        self.retrograde = array("b", [name in RETROGRADE_BODIES and speeds[name] < 0 for name in names])
+        sun_lon = positions["Sun"]
+        self.combust = array("b", [name in COMBUST_BODIES and abs((lon - sun_lon + 180) % 360 - 180) < 8
+                                   for name, lon in zip(names, lons)])
+
+    def __len__(self):
+        return len(self.names)
+
+    def to_dicts(self):
+        return [
+            {
+                "name": name,
+                "longitude": lon,
+                "sign": RASHIS[sign],
+                "house": house,
+                "degree_in_sign": lon % 30,
+                "nakshatra": NAKSHATRAS[nak],
+                "pada": pada,
+                "dignity": DIGNITIES[dignity],
+                "retrograde": bool(retro),
+                "combust": bool(combust),
+            }
+            for name, lon, sign, house, nak, pada, dignity, retro, combust in zip(
+                self.names, self.longitude, self.sign, self.house, self.nakshatra, self.pada,
+                self.dignity, self.retrograde, self.combust)
+        ]
+
+# Birth data calculated by warm_up(): every stage runs once with a known location
+WARM_UP_BIRTH = ("2000-01-01", "12:00:00", "warm-up", (28.6139, 77.2090, "Asia/Kolkata"))
 
 class KundliCalculator:
-    def __init__(self):
-        self.geolocator = Nominatim(user_agent="kundli_app")
-        self.tf = TimezoneFinder()
+    def __init__(self, geocode_cache: GeocodeCache = None):
+        self.geocode_cache = geocode_cache if geocode_cache is not None else GeocodeCache()
+        # The Nominatim client and the timezone polygons are built on first use (or by
+        # warm_up): constructing them dominates the cost of importing the service
+        self._geolocator = None
+        self._tz_resolver = None
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def geolocator(self):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            with self._lazy_lock:
+                if self._geolocator is None:
+                    self._geolocator = Nominatim(user_agent="kundli_app")
+        return self._geolocator
+
+    @property
+    def tz_resolver(self):
+        if self._tz_resolver is None:
+            with self._lazy_lock:
+                if self._tz_resolver is None:
+                    self._tz_resolver = TimezoneResolver()
+        return self._tz_resolver
+
+    def warm_up(self):
+        # Pays every first-use cost up front; returns {step: seconds}
+        dob, tob, place, location = WARM_UP_BIRTH
+        steps = (
+            ("timezones", lambda: self.tz_resolver.timezone_at(location[0], location[1])),
+            ("geocoder", lambda: self.geolocator),
+            ("ephemeris", ephemeris.warm_up),
+            ("kundli", lambda: self.calculate_kundli(dob, tob, place, location=location)),
+        )
+        timings = {}
+        for step, run in steps:
+            start = time.perf_counter()
+            run()
+            timings[step] = time.perf_counter() - start
+        return timings
 
     def geocode_place(self, place: str):
-        location = self.geolocator.geocode(place)
+        cached = self.geocode_cache.get(place)
+        if cached is not None:
+            return cached
+        with metrics.timed(metrics.STAGE_SECONDS, "geocode"):
+            location = self.geolocator.geocode(place)
         if not location:
             raise ValueError(f"Could not geocode place: {place}")
         lat, lon = location.latitude, location.longitude
-        timezone_str = self.tf.timezone_at(lng=lon, lat=lat)
+        with metrics.timed(metrics.STAGE_SECONDS, "timezone"):
+            timezone_str = self.tz_resolver.timezone_at(lat, lon)
         if not timezone_str:
             raise ValueError(f"Could not find timezone for: {place}")
+        self.geocode_cache.put(place, lat, lon, timezone_str)
+        return lat, lon, timezone_str
+
+    def resolve_location(self, lat: float, lon: float, timezone_str: str = None):
+        # Explicit coordinates skip geocoding; the zone comes from the grid index when not given
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Coordinates out of range: {lat},{lon}")
+        if not timezone_str:
+            timezone_str = self.tz_resolver.timezone_at(lat, lon)
+            if not timezone_str:
+                raise ValueError(f"Could not find timezone for: {lat},{lon}")
+        elif timezone_str not in pytz.all_timezones_set:
+            raise ValueError(f"Unknown timezone: {timezone_str}")
         return lat, lon, timezone_str
 
     def to_utc(self, dob: str, tob: str, timezone_str: str):
-        birth_datetime = datetime.strptime(f"{dob} {tob}", "%Y-%m-%d %H:%M:%S")
-        timezone = pytz.timezone(timezone_str)
-        birth_datetime_local = timezone.localize(birth_datetime)
-        birth_datetime_utc = birth_datetime_local.astimezone(pytz.utc)
-        return birth_datetime_utc
+        # Zone objects are cached per name in timezones.zone
+        return local_to_utc(dob, tob, timezone_str)
 
     def calculate_julian_day(self, dt_utc: datetime):
         return swe.julday(
@@ -34,265 +281,192 @@ class KundliCalculator:
             dt_utc.hour + dt_utc.minute/60 + dt_utc.second/3600
         )
 
-    def calculate_kundli(self, dob: str, tob: str, place: str):
-        lat, lon, timezone_str = self.geocode_place(place)
-        dt_utc = self.to_utc(dob, tob, timezone_str)
-        jd = self.calculate_julian_day(dt_utc)
+    def calculate_kundli(self, dob: str, tob: str, place: str, location: tuple = None, fields=None,
+                         transits_at: datetime = None):
+        # location=(lat, lon, timezone) skips geocoding when the caller already resolved the place.
+        # fields limits the result to the named output keys (or FIELD_GROUPS) and runs only
+        # the stages they need; None returns the full kundli.
+        # transits_at (aware datetime) is the instant of the transits section, which is
+        # empty without it.
+        keys = resolve_fields(fields, transits_at)
+        ctx = self._new_context(dob, tob, place, location)
+        ctx["transits_at"] = transits_at
+        self._run_stages(ctx, [KUNDLI_FIELDS[key] for key in keys])
+        kundli = {key: ctx[key] for key in keys}
+        if "planets" in kundli:
+            kundli["planets"] = kundli["planets"].to_dicts()
+        return kundli
 
-        # Planetary positions
-        planets = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN, swe.TRUE_NODE]
-        positions = {}
-        for planet in planets:
-            pos = swe.calc_ut(jd, planet)[0]
-            positions[swe.get_planet_name(planet)] = pos[0]  # Longitude
-        # Ketu is always opposite Rahu
-        rahu_long = positions.get('True Node', 0)
-        positions['Ketu'] = (rahu_long + 180) % 360
+    def vimshottari_dasha(self, dob: str, tob: str, place: str, location: tuple = None):
+        # Lazily expandable dasha timeline; only the stages up to the Moon's position run
+        ctx = self._new_context(dob, tob, place, location)
+        self._run_stages(ctx, ["panchang"])
+        return VimshottariDasha(ctx["moon_sidereal"], ctx["jd"])
 
-        # Ascendant and houses
-        houses, ascmc = swe.houses(jd, lat, lon, b'A')
+    def match_profile(self, dob: str, tob: str, place: str, location: tuple = None):
+        # Inputs of matching.MatchPool: the Moon's nakshatra pada key (0-107) and the house
+        # of Mars counted in whole sidereal signs from the lagna (for Mars dosha)
+        ctx = self._new_context(dob, tob, place, location)
+        self._run_stages(ctx, ["ephemeris", "houses", "panchang"])
+        moon = ctx["moon_sidereal"]
+        key = int(moon // ephemeris.NAKSHATRA_SPAN) * 4 + int(moon % ephemeris.NAKSHATRA_SPAN // ephemeris.PADA_SPAN)
+        mars_sign = int((ctx["positions"]["Mars"] - ctx["ayanamsha"]) % 360 // 30)
+        lagna_sign = int((ctx["ascmc"][0] - ctx["ayanamsha"]) % 360 // 30)
+        return key, (mars_sign - lagna_sign) % 12 + 1
 
-        # Ayanamsha (Lahiri)
-        ayanamsha = swe.get_ayanamsa(jd)
-
-        # Moon sign (Rashi)
-        moon_long = positions['Moon'] - ayanamsha
-        if moon_long < 0:
-            moon_long += 360
-        rashis = [
-            "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-        ]
-        moon_sign_index = int(moon_long // 30)
-        moon_sign = rashis[moon_sign_index]
-
-        # Nakshatra
-        nakshatras = [
-            "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashirsha", "Ardra", "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
-            "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha", "Uttara Ashadha", "Shravana", "Dhanishtha", "Shatabhisha",
-            "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
-        ]
-        nakshatra_index = int((moon_long % 360) // (360/27))
-        nakshatra = nakshatras[nakshatra_index]
-        # Charan (Pada)
-        charan = int(((moon_long % (360/27)) / ((360/27)/4)) + 1)
+    def _new_context(self, dob, tob, place, location):
+        return {"dob": dob, "tob": tob, "place": place, "location": location, "done": set()}
 
-        # Tithi
-        sun_long = positions['Sun'] - ayanamsha
-        if sun_long < 0:
-            sun_long += 360
-        tithi_num = int(((moon_long - sun_long) % 360) / 12) + 1
-        tithis = [
-            "Pratipada", "Dvitiya", "Tritiya", "Chaturthi", "Panchami", "Shashthi", "Saptami", "Ashtami", "Navami", "Dashami", "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi", "Purnima/Amavasya"
-        ]
-        tithi = tithis[(tithi_num-1)%15]
-        paksha = "Shukla" if tithi_num <= 15 else "Krishna"
-
-        # Yoga
-        yoga_num = int(((moon_long + sun_long) % 360) / (360/27)) + 1
-        yogas = [
-            "Vishkambha", "Priti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda", "Sukarman", "Dhriti", "Shoola", "Ganda", "Vriddhi", "Dhruva", "Vyaghata", "Harshana", "Vajra", "Siddhi", "Vyatipata", "Variyana", "Parigha", "Shiva", "Siddha", "Sadhya", "Shubha", "Shukla", "Brahma", "Indra", "Vaidhriti"
-        ]
-        yoga = yogas[(yoga_num-1)%27]
+    def _run_stages(self, ctx, stages):
+        for stage in stages:
+            if stage in ctx["done"]:
+                continue
+            deps, method = STAGES[stage]
+            self._run_stages(ctx, deps)
+            with metrics.timed(metrics.STAGE_SECONDS, stage):
+                getattr(self, method)(ctx)
+            ctx["done"].add(stage)
 
-        # Karana
-        karana_num = int((((moon_long - sun_long) % 360) % 12) / 6) + 1
-        karanas = [
-            "Bava", "Balava", "Kaulava", "Taitila", "Garaja", "Vanija", "Vishti", "Shakuni", "Chatushpada", "Naga", "Kimstughna"
-        ]
-        karana = karanas[(karana_num-1)%11]
-
-        # Sunrise and Sunset
-        # geopos = [longitude, latitude, altitude]
-        geopos = [lon, lat, 0]
-        try:
-            rsun = swe.rise_trans(jd, swe.SUN, None, swe.FLG_SWIEPH, 1 | 4, geopos, 0, 0)
-            sunrise = swe.revjul(rsun[1][0]) if rsun[1][0] > 0 else None
-            sunset = swe.revjul(rsun[1][1]) if rsun[1][1] > 0 else None
-        except Exception:
-            sunrise = sunset = None
-        sunrise_str = None
-        sunset_str = None
-        if sunrise:
-            sunrise_hour = int(float(sunrise[3]))
-            sunrise_min = int(float(sunrise[4]))
-            sunrise_sec = int(float(sunrise[5]))
-            sunrise_str = f"{sunrise_hour:02d}:{sunrise_min:02d}:{sunrise_sec:02d}"
-        if sunset:
-            sunset_hour = int(float(sunset[3]))
-            sunset_min = int(float(sunset[4]))
-            sunset_sec = int(float(sunset[5]))
-            sunset_str = f"{sunset_hour:02d}:{sunset_min:02d}:{sunset_sec:02d}"
-
-        # Ayanamsha value
-        ayanamsha_val = swe.get_ayanamsa(jd)
-
-        # Utility functions for sign, house, nakshatra, pada, dignity, retrograde, combustion
-        rashis = [
-            "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-        ]
-        rashi_lords = [
-            "Mars", "Venus", "Mercury", "Moon", "Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Saturn", "Jupiter"
-        ]
-        nakshatras = [
-            "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashirsha", "Ardra", "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
-            "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha", "Mula", "Purva Ashadha", "Uttara Ashadha", "Shravana", "Dhanishtha", "Shatabhisha",
-            "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
-        ]
-        exaltation = {
-            "Sun": "Aries", "Moon": "Taurus", "Mars": "Capricorn", "Mercury": "Virgo", "Jupiter": "Cancer", "Venus": "Pisces", "Saturn": "Libra"
-        }
-        debilitation = {
-            "Sun": "Libra", "Moon": "Scorpio", "Mars": "Cancer", "Mercury": "Pisces", "Jupiter": "Capricorn", "Venus": "Virgo", "Saturn": "Aries"
+    def _stage_location(self, ctx):
+        location = ctx["location"]
+        lat, lon, timezone_str = location if location is not None else self.geocode_place(ctx["place"])
+        ctx["lat"], ctx["lon"], ctx["timezone"] = lat, lon, timezone_str
+        # I. Foundational Birth Data
+        ctx["input"] = {
+            "dob": ctx["dob"],
+            "tob": ctx["tob"],
+            "place": ctx["place"],
+            "latitude": lat,
+            "longitude": lon,
+            "timezone": timezone_str
         }
-        moolatrikona = {
-            "Sun": "Leo", "Moon": "Taurus", "Mars": "Aries", "Mercury": "Virgo", "Jupiter": "Sagittarius", "Venus": "Libra", "Saturn": "Aquarius"
-        }
-        # Helper for sign index
-        def get_sign(lon):
-            idx = int((lon % 360) // 30)
-            return rashis[idx], idx
-        # Helper for house index
-        def get_house(lon, house_cusps):
-            diff = [(lon - c) % 360 for c in house_cusps]
-            min_diff = min(diff)
-            idx = diff.index(min_diff)
-            return idx+1
-        # Helper for nakshatra and pada
-        def get_nakshatra_pada(lon):
-            nak_idx = int((lon % 360) // (360/27))
-            pada = int(((lon % (360/27)) / ((360/27)/4)) + 1)
-            return nakshatras[nak_idx], pada
-        # Helper for dignity
-        def get_dignity(planet, sign):
-            if planet in exaltation and sign == exaltation[planet]:
-                return "Exalted"
-            if planet in debilitation and sign == debilitation[planet]:
-                return "Debilitated"
-            if planet in moolatrikona and sign == moolatrikona[planet]:
-                return "Moolatrikona"
-            if planet in rashi_lords and sign == planet:
-                return "Own Sign"
-            return "Neutral"
-        # Helper for retrograde
-        def is_retrograde(planet, jd):
-            if planet in [swe.SUN, swe.MOON]:
-                return False
-            result = swe.calc_ut(jd, planet)[0]
-            # result[3] is speed_longitude
-            return result[3] < 0
-        # Helper for combustion (approximate: Venus/Mercury/Mars/Jupiter/Saturn within 8 deg of Sun)
-        def is_combust(planet, planet_lon, sun_lon):
-            if planet not in ["Mercury", "Venus", "Mars", "Jupiter", "Saturn"]:
-                return False
-            diff = abs((planet_lon - sun_lon + 180) % 360 - 180)
-            return diff < 8
 
+    def _stage_julday(self, ctx):
+        dt_utc = self.to_utc(ctx["dob"], ctx["tob"], ctx["timezone"])
+        ctx["jd"] = self.calculate_julian_day(dt_utc)
+
+    def _stage_ephemeris(self, ctx):
+        # Planetary positions, speeds, ayanamsha and panchang indices in one ephemeris pass
+        chart = ephemeris.chart_arrays(ctx["jd"])
+        positions = {}
+        speeds = {}
+        for i, name in enumerate(ephemeris.PLANET_NAMES):
+            positions[name] = float(chart["positions"][0, i, ephemeris.LON])
+            speeds[name] = float(chart["positions"][0, i, ephemeris.SPEED])
+        # Ketu is always opposite Rahu
+        rahu_long = positions[swe.get_planet_name(swe.TRUE_NODE)]
+        positions['Ketu'] = (rahu_long + 180) % 360
+        ctx["chart"] = chart
+        ctx["positions"] = positions
+        ctx["speeds"] = speeds
+        # Ayanamsha (Lahiri)
+        ctx["ayanamsha"] = float(chart["ayanamsha"][0])
+
+    def _stage_houses(self, ctx):
+        # Ascendant and houses
+        houses, ascmc = swe.houses(ctx["jd"], ctx["lat"], ctx["lon"], b'A')
+        ctx["house_cusps"] = houses
+        ctx["ascmc"] = ascmc
         # Ascendant sign
-        asc_sign, _ = get_sign(ascmc[0])
+        asc_sign, _ = _get_sign(ascmc[0])
+        ctx["ascendant"] = {
+            "sign": asc_sign,
+            "degree": ascmc[0]
+        }
         # House cusp signs and lords
         house_list = []
         for i in range(12):
-            sign, sign_idx = get_sign(houses[i])
-            lord = rashi_lords[sign_idx]
+            sign, sign_idx = _get_sign(houses[i])
+            lord = RASHI_LORDS[sign_idx]
             house_list.append({
                 "number": i+1,
                 "cusp_degree": houses[i],
                 "sign": sign,
                 "lord": lord
             })
-        # Planets details
-        sun_lon = positions["Sun"]
-        planet_list = []
-        for planet in positions.keys():
-            lon = positions[planet]
-            sign, sign_idx = get_sign(lon)
-            house = get_house(lon, houses)
-            deg_in_sign = lon % 30
-            nak, pada = get_nakshatra_pada(lon)
-            dignity = get_dignity(planet, sign)
-            retro = False
-            combust = False
-            if planet in ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn"]:
-                swe_planet = getattr(swe, planet.upper()) if hasattr(swe, planet.upper()) else None
-                if swe_planet is not None:
-                    retro = is_retrograde(swe_planet, jd)
-            combust = is_combust(planet, lon, sun_lon)
-            planet_list.append({
-                "name": planet,
-                "longitude": lon,
-                "sign": sign,
-                "house": house,
-                "degree_in_sign": deg_in_sign,
-                "nakshatra": nak,
-                "pada": pada,
-                "dignity": dignity,
-                "retrograde": retro,
-                "combust": combust
-            })
-        # Aspects (basic Vedic aspects)
+        ctx["houses"] = house_list
+
+    def _stage_panchang(self, ctx):
+        # Reuse the full ephemeris pass when it already ran (fields are resolved in
+        # KUNDLI_FIELDS order, so it does whenever planets/ayanamsha were requested);
+        # otherwise the Sun and Moon are all the panchang needs
+        chart = ctx.get("chart")
+        if chart is None:
+            chart = ephemeris.chart_arrays(ctx["jd"], planets=ephemeris.LUMINARIES)
+        # Moon sign (Rashi), Nakshatra and Charan (Pada)
+        ctx["moon_sidereal"] = float(chart["moon_sidereal"][0])
+        ctx["moon_sign_index"] = int(chart["moon_sign"][0])
+        ctx["moon_sign"] = RASHIS[chart["moon_sign"][0]]
+        ctx["nakshatra"] = NAKSHATRAS[chart["nakshatra"][0]]
+        ctx["charan"] = int(chart["pada"][0]) + 1
+        # Tithi
+        tithi_num = int(chart["tithi"][0]) + 1
+        tithi = TITHIS[(tithi_num-1)%15]
+        paksha = "Shukla" if tithi_num <= 15 else "Krishna"
+        ctx["tithi"] = {"paksha": paksha, "tithi": tithi, "number": tithi_num}
+        # Yoga and Karana
+        ctx["yoga"] = YOGAS[chart["yoga"][0]]
+        ctx["karana"] = KARANAS[chart["karana"][0]]
+
+    def _stage_sunrise(self, ctx):
+        # Sunrise and Sunset on the birth date, local time
+        sunrise, sunset = ephemeris.sunrise_sunset(ctx["lat"], ctx["lon"], ctx["timezone"], ctx["dob"])
+        ctx["sunrise"] = ephemeris.jd_to_local(sunrise, ctx["timezone"]).strftime("%H:%M:%S") if sunrise else None
+        ctx["sunset"] = ephemeris.jd_to_local(sunset, ctx["timezone"]).strftime("%H:%M:%S") if sunset else None
+
+    def _stage_planets(self, ctx):
+        ctx["planets"] = PlanetTable(ctx["positions"], ctx["speeds"], ctx["house_cusps"])
+
+    def _stage_aspects(self, ctx):
+        table = ctx["planets"]
+        # Aspects (basic Vedic aspects); with nine planets a flat loop over pre-extracted
+        # tuples beats any array pass, so each pair costs one separation and a few compares
+        bodies = [(name, lon, RASHIS[sign], lon % 30, SPECIAL_ASPECTS.get(name, ()))
+                  for name, lon, sign in zip(table.names, table.longitude, table.sign)]
         aspect_list = []
         conjunctions = []
-        for i, p1 in enumerate(planet_list):
-            for j, p2 in enumerate(planet_list):
-                if i >= j:
-                    continue
+        for i, (name1, lon1, sign1, deg1, special) in enumerate(bodies):
+            for name2, lon2, sign2, deg2, _ in bodies[i + 1:]:
                 # Conjunction (within 8 degrees in same sign)
-                if p1["sign"] == p2["sign"] and abs(p1["degree_in_sign"] - p2["degree_in_sign"]) < 8:
-                    conjunctions.append({"planets": [p1["name"], p2["name"]], "sign": p1["sign"]})
+                if sign1 == sign2 and abs(deg1 - deg2) < 8:
+                    conjunctions.append({"planets": [name1, name2], "sign": sign1})
+                diff = abs((lon1 - lon2 + 180) % 360 - 180)
                 # 7th house aspect (opposition)
-                diff = abs((p1["longitude"] - p2["longitude"] + 180) % 360 - 180)
                 if abs(diff - 180) < 2:
-                    aspect_list.append({"from": p1["name"], "to": p2["name"], "type": "Opposition (7th aspect)"})
-                # Mars aspects 4th, 7th, 8th
-                if p1["name"] == "Mars":
-                    for aspect in [90, 180, 210]:
-                        if abs(diff - aspect) < 2:
-                            aspect_list.append({"from": p1["name"], "to": p2["name"], "type": f"Mars {aspect}° aspect"})
-                # Jupiter aspects 5th, 7th, 9th
-                if p1["name"] == "Jupiter":
-                    for aspect in [150, 180, 210]:
-                        if abs(diff - aspect) < 2:
-                            aspect_list.append({"from": p1["name"], "to": p2["name"], "type": f"Jupiter {aspect}° aspect"})
-                # Saturn aspects 3rd, 7th, 10th
-                if p1["name"] == "Saturn":
-                    for aspect in [90, 180, 270]:
-                        if abs(diff - aspect) < 2:
-                            aspect_list.append({"from": p1["name"], "to": p2["name"], "type": f"Saturn {aspect}° aspect"})
-        kundli = {
-            # I. Foundational Birth Data
-            "input": {
-                "dob": dob,
-                "tob": tob,
-                "place": place,
-                "latitude": lat,
-                "longitude": lon,
-                "timezone": timezone_str
-            },
-            # II. Derived Astrological Details
-            "ascendant": {
-                "sign": asc_sign,
-                "degree": ascmc[0]
-            },
-            "houses": house_list,
-            "planets": planet_list,
-            "ayanamsha": ayanamsha_val,
-            "moon_sign": moon_sign,
-            "nakshatra": nakshatra,
-            "charan": charan,
-            "tithi": {"paksha": paksha, "tithi": tithi, "number": tithi_num},
-            "yoga": yoga,
-            "karana": karana,
-            "sunrise": sunrise_str,
-            "sunset": sunset_str,
-            # Planetary Relationships & Aspects
-            "aspects": aspect_list,
-            "conjunctions": conjunctions,
-            # Yogas (advanced, not implemented)
-            "yogas": [],
-            # Divisional Charts (advanced, not implemented)
-            "divisional_charts": {},
-            # III. Dynamic Timing Factors (advanced, not implemented)
-            "dasha": {},
-            "transits": [],
+                    aspect_list.append({"from": name1, "to": name2, "type": "Opposition (7th aspect)"})
+                # Mars aspects 4th, 7th, 8th; Jupiter 5th, 7th, 9th; Saturn 3rd, 7th, 10th
+                for aspect in special:
+                    if abs(diff - aspect) < 2:
+                        aspect_list.append({"from": name1, "to": name2, "type": f"{name1} {aspect}° aspect"})
+        ctx["aspects"] = aspect_list
+        ctx["conjunctions"] = conjunctions
+
+    def _stage_divisional_charts(self, ctx):
+        # All 16 vargas from sidereal longitudes in one table lookup per varga
+        names = ["Ascendant"] + list(ctx["positions"])
+        lons = [ctx["ascmc"][0]] + list(ctx["positions"].values())
+        sidereal = ephemeris.sidereal(lons, ctx["ayanamsha"])
+        ctx["divisional_charts"] = {
+            varga: {name: RASHIS[int(sign)] for name, sign in zip(names, signs)}
+            for varga, signs in vargas.all_varga_signs(sidereal).items()
         }
-        return kundli
+
+    def _stage_yogas(self, ctx):
+        # Whole-sign sidereal placements through the compiled catalogue in yoga_rules
+        lons = [ctx["ascmc"][0]] + list(ctx["positions"].values())
+        signs = (ephemeris.sidereal(lons, ctx["ayanamsha"]) // 30).astype(int)
+        ctx["yogas"] = yoga_rules.ENGINE.detect(signs[0], signs[1:])
+
+    def _stage_dasha(self, ctx):
+        # Mahadasha level only; deeper levels come from dasha.VimshottariDasha on demand
+        ctx["dasha"] = VimshottariDasha(ctx["moon_sidereal"], ctx["jd"]).summary()
+
+    def _stage_transits(self, ctx):
+        # Sidereal positions at transits_at relative to the natal Moon sign (gochara);
+        # transit timelines over a date range come from transits.iter_transits
+        import transits
+        at = ctx.get("transits_at")
+        if at is None:
+            ctx["transits"] = []
+            return
+        ctx["transits"] = transits.transit_snapshot(ephemeris.datetime_to_jd(at), ctx["moon_sign_index"])
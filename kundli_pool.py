@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import ephemeris
+from kundli_calculator import KundliCalculator
+
+# Per-process calculator, created once by the pool initializer
+_worker_calc = None
+
+def _init_worker():
+    global _worker_calc
+    _worker_calc = KundliCalculator()
+    # First-touch cost of the ephemeris files is paid here, not by the first batch item
+    ephemeris.warm_up()
+
+def _warm_up(_):
+    return os.getpid()
+
+def _calculate_one(item, fields=None):
+    dob, tob, place, location = item
+    try:
+        return {"success": True, "kundli": _worker_calc.calculate_kundli(dob, tob, place, location=location, fields=fields)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def _calculate_chunk(items, fields=None):
+    return [_calculate_one(item, fields) for item in items]
+
+class KundliPool:
+    def __init__(self, max_workers: int = None, chunk_size: int = 32):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._running_executor()
+        return self
+
+    def _running_executor(self):
+        # Called from the warm-up thread and from request threads alike
+        with self._lock:
+            if self._executor is not None:
+                return self._executor
+            # spawn: forking a threaded ASGI server is unsafe
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # Force every worker to start (and run the initializer) now
+            list(executor.map(_warm_up, range(self.max_workers)))
+            self._executor = executor
+            return executor
+
+    def _discard(self, executor):
+        # A worker that dies breaks its executor for good; the next call builds a new one
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _with_executor(self, call):
+        # call(executor), retried once on a fresh pool if the pool breaks; a second
+        # BrokenProcessPool is raised to the caller
+        for attempt in range(2):
+            executor = self._running_executor()
+            try:
+                return call(executor)
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def submit(self, items, fields=None):
+        # items: list of (dob, tob, place, location) with location already resolved.
+        # Returns a Future of the results list, for callers that bound their own queue.
+        # A chunk already in flight when a worker dies fails with BrokenProcessPool
+        return self._with_executor(lambda executor: executor.submit(_calculate_chunk, items, fields))
+
+    def calculate_batch(self, records, geocoder):
+        # records: iterable of (dob, tob, place). Places are geocoded once each in the
+        # parent so workers never hit Nominatim; results come back in input order.
+        records = list(records)
+        locations = {}
+        for _, _, place in records:
+            if place not in locations:
+                try:
+                    locations[place] = geocoder(place)
+                except Exception as e:
+                    locations[place] = e
+        results = [None] * len(records)
+        pending = []
+        for i, (dob, tob, place) in enumerate(records):
+            location = locations[place]
+            if isinstance(location, Exception):
+                results[i] = {"success": False, "error": str(location)}
+            else:
+                pending.append((i, (dob, tob, place, location)))
+        if pending:
+            items = [item for _, item in pending]
+            computed = self._with_executor(
+                lambda executor: list(executor.map(_calculate_one, items, chunksize=self.chunk_size))
+            )
+            for (i, _), result in zip(pending, computed):
+                results[i] = result
+        return results
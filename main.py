@@ -1,11 +1,245 @@
-from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse
+import time
+# Measured from here: /ready reports how long importing this module took
+IMPORT_STARTED = time.perf_counter()
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Union
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from kundli_calculator import KundliCalculator
-from api import get_access_token, get_kundli, get_kundli_advanced, get_chart
+from kundli_calculator import KundliCalculator, RASHIS, resolve_fields
+from geocode_cache import GeocodeCache
+from kundli_pool import BrokenProcessPool, KundliPool
+import ephemeris
+import transits
+import panchang
+import electional
+from dasha import DASHA_LORDS, MAX_DEPTH
+from matching import MatchPool, describe_key, is_manglik
+import chart_renderer
+from response_cache import CACHE_CONTROL, ResponseCache, cache_key, etag_matches, make_etag
+import httpx
+from api import AsyncProkeralaClient
+import metrics
+from singleflight import SingleFlight
+from serialization import FastJSONResponse, negotiated_response
+
+@asynccontextmanager
+async def lifespan(app):
+    # Startup: warm up in the background (see /ready). Shutdown: stop the worker
+    # processes and close the Prokerala client.
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    try:
+        yield
+    finally:
+        kundli_pool.shutdown()
+        await prokerala.aclose()
+
+# Routes that return dicts are rendered with orjson; the calculation routes build their
+# Response themselves (negotiated_response), skipping jsonable_encoder entirely
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+# GEOCODE_CACHE_PATH persists geocoding results across restarts;
+# GAZETTEER_PATH preloads a place,latitude,longitude,timezone CSV so common cities skip Nominatim
+geocode_cache = GeocodeCache(os.getenv("GEOCODE_CACHE_PATH"))
+if os.getenv("GAZETTEER_PATH"):
+    geocode_cache.load_gazetteer(os.getenv("GAZETTEER_PATH"))
+kundli_calc = KundliCalculator(geocode_cache=geocode_cache)
+# One async client for all /prokerala/* routes: pooled connections, one cached OAuth token,
+# at most PROKERALA_MAX_CONCURRENCY upstream calls in flight, PROKERALA_TIMEOUT seconds each
+prokerala = AsyncProkeralaClient(
+    max_concurrency=int(os.getenv("PROKERALA_MAX_CONCURRENCY", "100")),
+    timeout=float(os.getenv("PROKERALA_TIMEOUT", "30")),
+)
+# Prokerala responses keyed by their canonical request parameters; RESPONSE_CACHE_DIR adds
+# a disk tier capped at RESPONSE_CACHE_MAX_BYTES
+response_cache = ResponseCache(
+    os.getenv("RESPONSE_CACHE_DIR"),
+    max_disk_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+# SVGs rendered by /chart; CHART_CACHE_ENTRIES bounds the in-memory LRU
+chart_cache = ResponseCache(max_memory_entries=int(os.getenv("CHART_CACHE_ENTRIES", "4096")))
+# Process pool for /generate_kundli/batch; KUNDLI_POOL_WORKERS defaults to the CPU count
+kundli_pool = KundliPool(int(os.getenv("KUNDLI_POOL_WORKERS", "0")) or None)
+MAX_BATCH_SIZE = 10000
+# Identical concurrent requests share one calculation / one upstream call
+kundli_flight = SingleFlight()
+prokerala_flight = SingleFlight()
+# Profiles scored by /match; MATCH_POOL_PATH keeps them in a CSV across restarts
+match_pool = MatchPool(os.getenv("MATCH_POOL_PATH"))
+MAX_MATCH_RESULTS = 1000
+
+def cache_lookups():
+    # Hit/miss counters of every cache, read at scrape time
+    lookups = {}
+    for name, stats in (("geocode", geocode_cache.stats()), ("responses", response_cache.stats()),
+                        ("charts", chart_cache.stats())):
+        lookups[(name, "hit")] = stats["hits"] + stats["disk_hits"]
+        lookups[(name, "miss")] = stats["misses"]
+    sun = ephemeris.sunrise_sunset.cache_info()
+    lookups[("sunrise", "hit")] = sun.hits
+    lookups[("sunrise", "miss")] = sun.misses
+    return lookups
+
+def cache_hit_ratios():
+    lookups = cache_lookups()
+    ratios = {}
+    for name in {name for name, _ in lookups}:
+        total = lookups[(name, "hit")] + lookups[(name, "miss")]
+        ratios[(name,)] = lookups[(name, "hit")] / total if total else 0.0
+    return ratios
+
+metrics.GaugeFunc("cache_lookups", "Cache lookups by cache and result", ("cache", "result"), cache_lookups)
+metrics.GaugeFunc("cache_hit_ratio", "Cache hits / lookups", ("cache",), cache_hit_ratios)
+
+def singleflight_calls():
+    calls = {}
+    for name, flight in (("kundli", kundli_flight), ("prokerala", prokerala_flight)):
+        stats = flight.stats()
+        calls[(name, "leader")] = stats["leaders"]
+        calls[(name, "follower")] = stats["followers"]
+    return calls
+
+metrics.GaugeFunc("singleflight_calls", "Calls that ran (leader) or shared an in-flight call (follower)",
+                  ("group", "role"), singleflight_calls)
+
+class TimingHeaderMiddleware:
+    """Opt-in per-request breakdown: send any X-Timing request header to get
+    X-Timing: <stage>;dur=<ms>, ... back.
+
+    Plain ASGI: requests without the header go straight to the app, and response
+    bodies (the NDJSON streams included) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == b"x-timing" for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        timings = []
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            # Headers go out with the response start, so total runs up to it
+            if message["type"] == "http.response.start":
+                timings.append(("total", time.perf_counter() - start))
+                header = metrics.timing_header(timings).encode("latin-1")
+                message = dict(message, headers=[*message.get("headers", ()), (b"x-timing", header)])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.request_timings.reset(token)
+
+app.add_middleware(TimingHeaderMiddleware)
+
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-app = FastAPI()
-kundli_calc = KundliCalculator()
+# Startup warm-up state. The server accepts connections at once; /ready answers 503 until
+# the warm-up thread has paid every first-use cost. STARTUP_BUDGET_SECONDS is the import +
+# warm-up time above which /ready reports the startup as over budget.
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
+IMPORT_SECONDS = None
+warm_up_timings = {}
+warm_up_error = None
+warm_up_done = threading.Event()
+metrics.GaugeFunc("startup_seconds", "Module import and warm-up steps, in seconds", ("step",),
+                  lambda: {("import",): IMPORT_SECONDS, **{(step,): t for step, t in warm_up_timings.items()}})
+
+def warm_up():
+    global warm_up_error
+    try:
+        warm_up_timings.update(kundli_calc.warm_up())
+        start = time.perf_counter()
+        kundli_pool.start()
+        warm_up_timings["kundli_pool"] = time.perf_counter() - start
+    except Exception as e:
+        import traceback
+        warm_up_error = f"{e!r}\n{traceback.format_exc()}"
+    finally:
+        warm_up_done.set()
+
+@app.get("/ready", summary="Readiness probe", tags=["Service"])
+def ready():
+    # 200 once warm-up has finished; 503 while it runs or if it failed
+    startup = IMPORT_SECONDS + sum(warm_up_timings.values())
+    body = {
+        "ready": warm_up_done.is_set() and warm_up_error is None,
+        "import_seconds": IMPORT_SECONDS,
+        "warm_up_seconds": dict(warm_up_timings),
+        "startup_seconds": startup,
+        "budget_seconds": STARTUP_BUDGET_SECONDS,
+        "within_budget": startup <= STARTUP_BUDGET_SECONDS,
+    }
+    if warm_up_error is not None:
+        body["error"] = warm_up_error
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+def upstream_timeout(e):
+    return HTTPException(status_code=504, detail=f"Prokerala request timed out: {e!r}")
+
+def conditional_response(request: Request, response: Response):
+    # Strong ETag over the exact representation; a matching If-None-Match gets an empty 304
+    etag = make_etag(response.body)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if request is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
+async def cached_kundli_json(kind, ayanamsa, coordinates, datetime_str):
+    # Raw upstream JSON bytes for /kundli or /kundli/advanced, fetched at most once per parameter set
+    key = cache_key(kind, ayanamsa, coordinates, datetime_str)
+    body = await response_cache.get_async(key)
+    if body is None:
+        body = await prokerala_flight.do_async(key, fetch_kundli_json, key, kind, ayanamsa, coordinates, datetime_str)
+    return body
+
+async def fetch_kundli_json(key, kind, ayanamsa, coordinates, datetime_str):
+    fetch = prokerala.get_kundli if kind == "kundli" else prokerala.get_kundli_advanced
+    result = await fetch(ayanamsa, coordinates, datetime_str)
+    body = json.dumps(result, separators=(",", ":")).encode("utf-8")
+    await response_cache.put_async(key, body)
+    return body
+
+async def cached_chart_svg(ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                           la=None, upagraha_position=None):
+    # Empty la/upagraha_position are dropped upstream, so they share a key with None
+    la = la or None
+    upagraha_position = upagraha_position or None
+    key = cache_key("chart", ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                    la, upagraha_position)
+    body = await response_cache.get_async(key)
+    if body is None:
+        body = await prokerala_flight.do_async(
+            key, fetch_chart_svg, key, ayanamsa, coordinates, datetime_str, chart_type, chart_style,
+            format, la, upagraha_position
+        )
+    return body.decode("utf-8")
+
+async def fetch_chart_svg(key, ayanamsa, coordinates, datetime_str, chart_type, chart_style, format,
+                          la, upagraha_position):
+    svg = await prokerala.get_chart(
+        ayanamsa=ayanamsa,
+        coordinates=coordinates,
+        datetime_str=datetime_str,
+        chart_type=chart_type,
+        chart_style=chart_style,
+        format=format,
+        la=la,
+        upagraha_position=upagraha_position
+    )
+    body = svg.encode("utf-8")
+    await response_cache.put_async(key, body)
+    return body
 
 class KundliRequest(BaseModel):
     dob: str  # Format: YYYY-MM-DD
@@ -14,6 +248,11 @@ class KundliRequest(BaseModel):
 
 from fastapi import Body
 
+def parse_utc(at: str):
+    # YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS[+offset] -> aware datetime (UTC when no offset)
+    at_dt = datetime.fromisoformat(at)
+    return at_dt.replace(tzinfo=timezone.utc) if at_dt.tzinfo is None else at_dt
+
 @app.post("/generate_kundli", summary="Generate Kundli", response_description="Kundli details", tags=["Kundli"])
 def generate_kundli(
     req: KundliRequest = Body(
@@ -23,48 +262,373 @@ def generate_kundli(
             "tob": "10:30:00",
             "place": "Delhi, India"
         }
+    ),
+    fields: str = Query(None, description="Comma-separated kundli sections to compute, e.g. planets,panchang (default: all)"),
+    transits_at: str = Query(None, description="UTC instant for the transits section, YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS (required to name transits in fields; without it the section is empty)"),
+    request: Request = None
+):
+    try:
+        # keys only canonicalise the single-flight key ("planets,houses" and "houses,planets"
+        # coalesce); calculate_kundli resolves fields as sent
+        at = parse_utc(transits_at) if transits_at else None
+        keys = resolve_fields(fields, at)
+        kundli = kundli_flight.do(
+            cache_key("kundli", req.dob, req.tob, req.place, keys, at),
+            kundli_calc.calculate_kundli, req.dob, req.tob, req.place, fields=fields, transits_at=at
+        )
+        return negotiated_response({"success": True, "kundli": kundli}, request.headers.get("accept"))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+class CoordinatesKundliRequest(BaseModel):
+    dob: str  # Format: YYYY-MM-DD
+    tob: str  # Format: HH:MM:SS
+    latitude: float
+    longitude: float
+    timezone: Optional[str] = None  # IANA name; resolved from the coordinates when omitted
+    place: Optional[str] = None  # Label echoed in input.place
+
+@app.post("/generate_kundli/coordinates", summary="Generate Kundli from coordinates", response_description="Kundli details", tags=["Kundli"])
+def generate_kundli_coordinates(
+    req: CoordinatesKundliRequest = Body(
+        ...,
+        example={
+            "dob": "1990-01-01",
+            "tob": "10:30:00",
+            "latitude": 28.6139,
+            "longitude": 77.2090,
+            "timezone": "Asia/Kolkata"
+        }
+    ),
+    fields: str = Query(None, description="Comma-separated kundli sections to compute, e.g. planets,panchang (default: all)"),
+    transits_at: str = Query(None, description="UTC instant for the transits section, YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS (required to name transits in fields; without it the section is empty)"),
+    request: Request = None
+):
+    # No geocoding: callers that already know where the birth place is skip Nominatim entirely
+    try:
+        location = kundli_calc.resolve_location(req.latitude, req.longitude, req.timezone)
+        place = req.place or f"{req.latitude},{req.longitude}"
+        at = parse_utc(transits_at) if transits_at else None
+        keys = resolve_fields(fields, at)
+        kundli = kundli_flight.do(
+            cache_key("kundli", req.dob, req.tob, place, location, keys, at),
+            kundli_calc.calculate_kundli, req.dob, req.tob, place, location=location, fields=fields, transits_at=at
+        )
+        return negotiated_response({"success": True, "kundli": kundli}, request.headers.get("accept"))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+@app.post("/generate_kundli/batch", summary="Generate Kundlis in bulk", response_description="Per-item results in input order", tags=["Kundli"])
+def generate_kundli_batch(reqs: List[KundliRequest], request: Request = None):
+    if len(reqs) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(reqs)} items (max {MAX_BATCH_SIZE})")
+    try:
+        results = kundli_pool.calculate_batch(
+            ((req.dob, req.tob, req.place) for req in reqs), kundli_calc.geocode_place
+        )
+        return negotiated_response({"success": True, "results": results}, request.headers.get("accept"))
+    except BrokenProcessPool as e:
+        raise HTTPException(status_code=503, detail=f"Kundli worker pool failed: {e!r}")
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+@app.post("/transits", summary="Transit timeline (NDJSON stream)", tags=["Kundli"])
+def transit_timeline(
+    req: KundliRequest,
+    start: str = Query(..., description="First day of the range (UTC), YYYY-MM-DD"),
+    end: str = Query(..., description="Day after the last day of the range (UTC), YYYY-MM-DD"),
+    planets: str = Query(None, description=f"Comma-separated bodies (default: all of {', '.join(transits.BODY_NAMES)})"),
+    events: str = Query(None, description=f"Comma-separated event types (default: {', '.join(transits.EVENT_TYPES)})")
+):
+    try:
+        start_jd = ephemeris.datetime_to_jd(datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=timezone.utc))
+        end_jd = ephemeris.datetime_to_jd(datetime.strptime(end, "%Y-%m-%d").replace(tzinfo=timezone.utc))
+        if end_jd <= start_jd:
+            raise ValueError("end must be after start")
+        planet_list = [p.strip() for p in planets.split(",")] if planets else None
+        for planet in planet_list or []:
+            if planet not in transits.BODY_NAMES:
+                raise ValueError(f"Unknown planet: {planet}")
+        event_types = [e.strip() for e in events.split(",")] if events else transits.EVENT_TYPES
+        for event_type in event_types:
+            if event_type not in transits.EVENT_TYPES:
+                raise ValueError(f"Unknown event type: {event_type}")
+        natal = kundli_calc.calculate_kundli(req.dob, req.tob, req.place, fields="moon_sign")
+        natal_moon_sign = RASHIS.index(natal["moon_sign"])
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+    # One JSON object per line, produced as the engine walks the range
+    lines = (
+        json.dumps(event) + "\n"
+        for event in transits.iter_transits(start_jd, end_jd, planet_list, event_types, natal_moon_sign)
     )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/panchang", summary="Daily panchang calendar", tags=["Kundli"])
+def panchang_calendar(
+    place: str = Query(..., description="Place name, e.g. Delhi, India"),
+    start: str = Query(..., description="First local date, YYYY-MM-DD"),
+    end: str = Query(..., description=f"Day after the last local date, YYYY-MM-DD (at most {panchang.MAX_DAYS} days)"),
+    request: Request = None
+):
+    try:
+        days = (datetime.strptime(end, "%Y-%m-%d") - datetime.strptime(start, "%Y-%m-%d")).days
+        if days < 1:
+            raise ValueError("end must be after start")
+        lat, lon, timezone_str = kundli_calc.geocode_place(place)
+        return negotiated_response({
+            "success": True,
+            "place": place,
+            "latitude": lat,
+            "longitude": lon,
+            "timezone": timezone_str,
+            "days": panchang.daily_panchang(lat, lon, timezone_str, start, days),
+        }, request.headers.get("accept"))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+class ElectionalConstraint(BaseModel):
+    quantity: str  # nakshatra, sign, tithi, yoga, karana, retrograde, combust or ascendant
+    values: List[Union[bool, int, str]]  # names; tithi numbers 1-30 or Shukla/Krishna; true/false for flags
+    body: Optional[str] = None  # Sun ... Ketu; nakshatra and sign default to the Moon
+    negate: bool = False  # match when the quantity is none of values
+
+class ElectionalRequest(BaseModel):
+    start: str  # First local date, YYYY-MM-DD
+    days: int
+    constraints: List[ElectionalConstraint]
+    place: Optional[str] = None
+    latitude: Optional[float] = None  # with longitude, used instead of place
+    longitude: Optional[float] = None
+    timezone: Optional[str] = None  # IANA name; resolved from the coordinates when omitted
+
+@app.post("/electional", summary="Time windows where every constraint holds", tags=["Kundli"])
+def electional_search(
+    req: ElectionalRequest = Body(
+        ...,
+        example={
+            "start": "2024-01-01",
+            "days": 90,
+            "place": "Delhi, India",
+            "constraints": [
+                {"quantity": "nakshatra", "body": "Moon", "values": ["Rohini"]},
+                {"quantity": "tithi", "values": ["Shukla"]},
+                {"quantity": "combust", "body": "Jupiter", "values": [True], "negate": True}
+            ]
+        }
+    ),
+    request: Request = None
+):
+    # Searched on coarse grids refined at each boundary, never minute by minute
+    try:
+        if req.latitude is not None and req.longitude is not None:
+            lat, lon, timezone_str = kundli_calc.resolve_location(req.latitude, req.longitude, req.timezone)
+        elif req.place:
+            lat, lon, timezone_str = kundli_calc.geocode_place(req.place)
+        else:
+            raise ValueError("Pass place or latitude and longitude")
+        windows = electional.search(lat, lon, timezone_str, req.start, req.days,
+                                    [constraint.model_dump() for constraint in req.constraints])
+        return negotiated_response({
+            "success": True,
+            "place": req.place,
+            "latitude": lat,
+            "longitude": lon,
+            "timezone": timezone_str,
+            "windows": windows,
+        }, request.headers.get("accept"))
+    except electional.UnsupportedLatitude as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+MAX_DASHA_TREE_NODES = 9 ** 4
+
+@app.post("/dasha", summary="Vimshottari dasha periods", tags=["Kundli"])
+def vimshottari_dasha(
+    req: KundliRequest,
+    depth: int = Query(2, ge=1, le=MAX_DEPTH, description="Levels to expand: 1=maha, 2=antar, 3=pratyantar, 4=sookshma, 5=prana"),
+    path: str = Query(None, description="Expand only below this period, e.g. Venus/Sun"),
+    at: str = Query(None, description="UTC instant for the active periods, YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS (default: now)"),
+    request: Request = None
+):
+    try:
+        # The whole tree is 9 ** depth periods; one branch (path=) never passes MAX_DEPTH
+        # and stays within 9 ** (MAX_DEPTH - 1) below its root
+        if not path and 9 ** depth > MAX_DASHA_TREE_NODES:
+            raise ValueError(f"depth {depth} expands {9 ** depth} periods; pass path= to expand one branch")
+        at_dt = parse_utc(at) if at else datetime.now(timezone.utc)
+        dasha = kundli_calc.vimshottari_dasha(req.dob, req.tob, req.place)
+        if path:
+            root = dasha.find([lord.strip() for lord in path.split("/") if lord.strip()])
+            # root itself plus up to depth levels below it, never past the last level
+            periods = [root.to_dict(1 + min(depth, MAX_DEPTH - 1 - root.level))]
+        else:
+            periods = [period.to_dict(depth) for period in dasha.mahadashas()]
+        active = dasha.active_at(ephemeris.datetime_to_jd(at_dt), MAX_DEPTH)
+        return negotiated_response({
+            "success": True,
+            "birth_lord": DASHA_LORDS[dasha.birth_lord],
+            "balance_years": dasha.balance_years,
+            "periods": periods,
+            "active": {"at": at_dt.isoformat(), "periods": [period.to_dict() for period in active]},
+        }, request.headers.get("accept"))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+class MatchRequest(KundliRequest):
+    gender: str  # male or female
+
+class MatchProfile(MatchRequest):
+    id: str
+
+@app.post("/match/profiles", summary="Add profiles to the match pool", tags=["Matching"])
+def add_match_profiles(reqs: List[MatchProfile]):
+    if len(reqs) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(reqs)} items (max {MAX_BATCH_SIZE})")
+    try:
+        profiles = []
+        for req in reqs:
+            if req.gender not in ("male", "female"):
+                raise ValueError(f"Unknown gender for {req.id}: {req.gender}")
+            key, mars_house = kundli_calc.match_profile(req.dob, req.tob, req.place)
+            profiles.append((req.id, req.gender, key, mars_house))
+        match_pool.add_many(profiles)
+        return {"success": True, "added": len(profiles), "pool_size": len(match_pool)}
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+@app.post("/match", summary="Best Ashtakoota matches from the pool", tags=["Matching"])
+def match(
+    req: MatchRequest,
+    top_k: int = Query(10, ge=1, le=MAX_MATCH_RESULTS, description="Number of matches to return"),
+    min_score: float = Query(0, ge=0, le=36, description="Lowest total guna score to return"),
+    manglik_match: bool = Query(False, description="Only candidates with the same Mars dosha status"),
+    request: Request = None
+):
+    try:
+        key, mars_house = kundli_calc.match_profile(req.dob, req.tob, req.place)
+        matches = match_pool.top_matches(key, req.gender, mars_house, top_k, min_score, manglik_match)
+        return negotiated_response({
+            "success": True,
+            "profile": {**describe_key(key), "manglik": is_manglik(mars_house)},
+            "matches": matches,
+        }, request.headers.get("accept"))
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+CHART_FIELDS = resolve_fields("divisional_charts,planets")
+
+def render_local_chart(key, dob, tob, place, location, chart_type, chart_style):
+    kundli = kundli_calc.calculate_kundli(dob, tob, place, location=location, fields=CHART_FIELDS)
+    body = chart_renderer.render_kundli_chart(kundli, chart_type, chart_style).encode("utf-8")
+    chart_cache.put(key, body)
+    return body
+
+@app.get("/chart", summary="Local SVG chart", response_description="SVG image", tags=["Kundli"])
+def chart(
+    dob: str = Query(..., description="Date of birth, YYYY-MM-DD"),
+    tob: str = Query(..., description="Time of birth, HH:MM:SS"),
+    place: str = Query(None, description="Place name; must already be in the geocode cache (gazetteer or an earlier request)"),
+    latitude: float = Query(None, description="Birth latitude; with longitude, used instead of place"),
+    longitude: float = Query(None, description="Birth longitude"),
+    timezone: str = Query(None, description="IANA zone for the coordinates (default: resolved from them)"),
+    chart_type: str = Query("rasi", description="rasi, navamsa, ... or a varga code such as D9"),
+    chart_style: str = Query("north-indian", description="Chart style: north-indian, south-indian, east-indian"),
+    request: Request = None
 ):
+    # Rendered from calculate_kundli output: no Prokerala call, and no Nominatim call either
     try:
-        kundli = kundli_calc.calculate_kundli(req.dob, req.tob, req.place)
-        return {"success": True, "kundli": kundli}
+        if chart_style not in chart_renderer.STYLES:
+            raise ValueError(f"Unknown chart style: {chart_style}")
+        varga = chart_renderer.chart_varga(chart_type)
+        if latitude is not None and longitude is not None:
+            location = kundli_calc.resolve_location(latitude, longitude, timezone)
+            place = place or f"{latitude},{longitude}"
+        elif place:
+            location = geocode_cache.get(place)
+            if location is None:
+                raise ValueError(f"{place} is not in the geocode cache: pass latitude and longitude")
+        else:
+            raise ValueError("Pass place or latitude and longitude")
+        key = cache_key("local-chart", dob, tob, location, varga, chart_style)
+        body = chart_cache.get(key)
+        if body is None:
+            body = kundli_flight.do(key, render_local_chart, key, dob, tob, place, location, varga, chart_style)
+        return conditional_response(request, Response(content=body, media_type="image/svg+xml"))
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
 
+@app.get("/cache/charts", summary="Local chart cache statistics", tags=["Kundli"])
+def chart_cache_stats():
+    return chart_cache.stats()
+
+@app.get("/cache/geocode", summary="Geocode cache statistics", tags=["Kundli"])
+def geocode_cache_stats():
+    return geocode_cache.stats()
+
+@app.get("/cache/responses", summary="Prokerala response cache statistics", tags=["Prokerala"])
+def response_cache_stats():
+    return response_cache.stats()
+
 @app.get("/prokerala/kundli", summary="Prokerala Basic Kundli", tags=["Prokerala"])
-def prokerala_kundli(
+async def prokerala_kundli(
     ayanamsa: int = Query(1, description="Ayanamsa system: 1=Lahiri, 3=Raman, 5=KP"),
     coordinates: str = Query(..., description="Latitude,Longitude e.g. 23.1765,75.7885"),
-    datetime_str: str = Query(..., description="ISO datetime e.g. 2022-03-17T10:50:40+00:00")
+    datetime_str: str = Query(..., description="ISO datetime e.g. 2022-03-17T10:50:40+00:00"),
+    request: Request = None
 ):
     try:
-        access_token = get_access_token()
-        result = get_kundli(access_token, ayanamsa, coordinates, datetime_str)
-        return {"success": True, "data": result}
+        data = await cached_kundli_json("kundli", ayanamsa, coordinates, datetime_str)
+        body = b'{"success":true,"data":' + data + b"}"
+        return conditional_response(request, Response(content=body, media_type="application/json"))
+    except httpx.TimeoutException as e:
+        raise upstream_timeout(e)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
 
 @app.get("/prokerala/kundli-advanced", summary="Prokerala Advanced Kundli", tags=["Prokerala"])
-def prokerala_kundli_advanced(
+async def prokerala_kundli_advanced(
     ayanamsa: int = Query(1, description="Ayanamsa system: 1=Lahiri, 3=Raman, 5=KP"),
     coordinates: str = Query(..., description="Latitude,Longitude e.g. 23.1765,75.7885"),
-    datetime_str: str = Query(..., description="ISO datetime e.g. 2022-03-17T10:50:40+00:00")
+    datetime_str: str = Query(..., description="ISO datetime e.g. 2022-03-17T10:50:40+00:00"),
+    request: Request = None
 ):
     try:
-        access_token = get_access_token()
-        result = get_kundli_advanced(access_token, ayanamsa, coordinates, datetime_str)
-        return {"success": True, "data": result}
+        data = await cached_kundli_json("kundli-advanced", ayanamsa, coordinates, datetime_str)
+        body = b'{"success":true,"data":' + data + b"}"
+        return conditional_response(request, Response(content=body, media_type="application/json"))
+    except httpx.TimeoutException as e:
+        raise upstream_timeout(e)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
 
 @app.get("/prokerala/chart", summary="Prokerala SVG Chart (JSON)", tags=["Prokerala"])
-def prokerala_chart(
+async def prokerala_chart(
     ayanamsa: int = Query(1, description="Ayanamsa system: 1=Lahiri, 3=Raman, 5=KP"),
     coordinates: str = Query("23.1765,75.7885", description="Latitude,Longitude e.g. 23.1765,75.7885"),
     datetime_str: str = Query(
@@ -79,17 +643,8 @@ def prokerala_chart(
     request: Request = None
 ):
     try:
-        access_token = get_access_token()
-        svg = get_chart(
-            access_token,
-            ayanamsa=ayanamsa,
-            coordinates=coordinates,
-            datetime_str=datetime_str,
-            chart_type=chart_type,
-            chart_style=chart_style,
-            format=format,
-            la=la,
-            upagraha_position=upagraha_position
+        svg = await cached_chart_svg(
+            ayanamsa, coordinates, datetime_str, chart_type, chart_style, format, la, upagraha_position
         )
         # Construct direct view URL using actual user-provided values
         import urllib.parse
@@ -107,7 +662,10 @@ def prokerala_chart(
         if upagraha_position:
             params["upagraha_position"] = upagraha_position
         view_url = base_url.rstrip("/") + "/prokerala/chart-view?" + urllib.parse.urlencode(params)
-        return {"svg": svg, "view_url": view_url}
+        # view_url hits /prokerala/chart-view with the same parameters, which is served from the cache
+        return conditional_response(request, JSONResponse({"svg": svg, "view_url": view_url}))
+    except httpx.TimeoutException as e:
+        raise upstream_timeout(e)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
@@ -116,7 +674,7 @@ def prokerala_chart(
 # /prokerala/chart-view endpoint with no .replace logic
 from fastapi.responses import HTMLResponse
 @app.get("/prokerala/chart-view", summary="Prokerala SVG Chart (HTML view)", tags=["Prokerala"])
-def prokerala_chart_view(
+async def prokerala_chart_view(
     ayanamsa: int = Query(1),
     coordinates: str = Query("23.1765,75.7885"),
     datetime_str: str = Query("2022-03-17T10:50:40+00:00"),
@@ -124,20 +682,12 @@ def prokerala_chart_view(
     chart_style: str = Query("north-indian"),
     format: str = Query("svg"),
     la: str = Query(None),
-    upagraha_position: str = Query(None)
+    upagraha_position: str = Query(None),
+    request: Request = None
 ):
     try:
-        access_token = get_access_token()
-        svg = get_chart(
-            access_token,
-            ayanamsa=ayanamsa,
-            coordinates=coordinates,
-            datetime_str=datetime_str,
-            chart_type=chart_type,
-            chart_style=chart_style,
-            format=format,
-            la=la,
-            upagraha_position=upagraha_position
+        svg = await cached_chart_svg(
+            ayanamsa, coordinates, datetime_str, chart_type, chart_style, format, la, upagraha_position
         )
         html = f"""
         <html>
@@ -154,8 +704,12 @@ def prokerala_chart_view(
         </body>
         </html>
         """
-        return HTMLResponse(content=html)
+        return conditional_response(request, HTMLResponse(content=html))
+    except httpx.TimeoutException as e:
+        raise upstream_timeout(e)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
         raise HTTPException(status_code=400, detail=f"{str(e)}\nTraceback:\n{tb}")
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
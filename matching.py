@@ -0,0 +1,262 @@
+import csv
+import os
+import threading
+import numpy as np
+from kundli_calculator import NAKSHATRAS, RASHIS, RASHI_LORDS
+
+# Profiles are keyed by the Moon's nakshatra pada: key = nakshatra * 4 + (pada - 1), 0..107.
+# A sign holds exactly nine padas, so the Moon sign is key // 9.
+KEYS = 108
+KOOTAS = ["varna", "vashya", "tara", "yoni", "graha_maitri", "gana", "bhakoot", "nadi"]
+MAX_POINTS = {"varna": 1, "vashya": 2, "tara": 3, "yoni": 4, "graha_maitri": 5, "gana": 6, "bhakoot": 7, "nadi": 8}
+MAX_SCORE = 36
+
+# Houses from the lagna that make Mars dosha
+MANGLIK_HOUSES = {1, 2, 4, 7, 8, 12}
+
+# Varna by sign: 0 Shudra, 1 Vaishya, 2 Kshatriya, 3 Brahmin
+VARNA = [2, 1, 0, 3, 2, 1, 0, 3, 2, 1, 0, 3]
+
+# Vashya by sign: 0 Chatushpada, 1 Manava, 2 Jalachara, 3 Vanachara, 4 Keeta.
+# Sagittarius and Capricorn change class mid-sign; the whole sign takes its first half's class.
+VASHYA = [0, 0, 1, 2, 3, 1, 1, 4, 1, 0, 1, 2]
+VASHYA_POINTS = [
+    [2, 1, 1, 0.5, 1],
+    [1, 2, 0.5, 0, 1],
+    [1, 0.5, 2, 1, 1],
+    [0.5, 0, 1, 2, 0],
+    [1, 1, 1, 0, 2],
+]
+
+# Yoni animal by nakshatra: 0 Horse, 1 Elephant, 2 Sheep, 3 Serpent, 4 Dog, 5 Cat, 6 Rat,
+# 7 Cow, 8 Buffalo, 9 Tiger, 10 Deer, 11 Monkey, 12 Mongoose, 13 Lion
+YONI = [0, 1, 2, 3, 3, 4, 5, 2, 5, 6, 6, 7, 8, 9, 8, 9, 10, 10, 4, 11, 12, 11, 13, 0, 13, 7, 1]
+YONI_POINTS = [
+    [4, 2, 2, 3, 2, 2, 2, 1, 0, 1, 3, 3, 2, 1],
+    [2, 4, 3, 3, 2, 2, 2, 2, 3, 1, 2, 3, 2, 0],
+    [2, 3, 4, 2, 1, 2, 1, 3, 3, 1, 2, 0, 3, 1],
+    [3, 3, 2, 4, 2, 1, 1, 1, 1, 2, 2, 2, 0, 2],
+    [2, 2, 1, 2, 4, 2, 1, 2, 2, 1, 0, 2, 1, 1],
+    [2, 2, 2, 1, 2, 4, 0, 2, 2, 1, 3, 3, 2, 1],
+    [2, 2, 1, 1, 1, 0, 4, 2, 2, 2, 2, 2, 1, 2],
+    [1, 2, 3, 1, 2, 2, 2, 4, 3, 0, 3, 2, 2, 1],
+    [0, 3, 3, 1, 2, 2, 2, 3, 4, 1, 2, 2, 2, 1],
+    [1, 1, 1, 2, 1, 1, 2, 0, 1, 4, 1, 1, 2, 1],
+    [3, 2, 2, 2, 0, 3, 2, 3, 2, 1, 4, 2, 2, 1],
+    [3, 3, 0, 2, 2, 3, 2, 2, 2, 1, 2, 4, 3, 2],
+    [2, 2, 3, 0, 1, 2, 1, 2, 2, 2, 2, 3, 4, 2],
+    [1, 0, 1, 2, 1, 1, 2, 1, 1, 1, 1, 2, 2, 4],
+]
+
+# Natural friendships of the sign lords
+FRIENDS = {
+    "Sun": {"Moon", "Mars", "Jupiter"},
+    "Moon": {"Sun", "Mercury"},
+    "Mars": {"Sun", "Moon", "Jupiter"},
+    "Mercury": {"Sun", "Venus"},
+    "Jupiter": {"Sun", "Moon", "Mars"},
+    "Venus": {"Mercury", "Saturn"},
+    "Saturn": {"Mercury", "Venus"},
+}
+ENEMIES = {
+    "Sun": {"Venus", "Saturn"},
+    "Moon": set(),
+    "Mars": {"Mercury"},
+    "Mercury": {"Moon"},
+    "Jupiter": {"Mercury", "Venus"},
+    "Venus": {"Sun", "Moon"},
+    "Saturn": {"Sun", "Moon", "Mars"},
+}
+# Points by the pair of relations each lord has towards the other (friend, neutral, enemy)
+MAITRI_POINTS = {
+    ("friend", "friend"): 5, ("friend", "neutral"): 4, ("neutral", "neutral"): 3,
+    ("friend", "enemy"): 1, ("neutral", "enemy"): 0.5, ("enemy", "enemy"): 0,
+}
+
+# Gana by nakshatra: 0 Deva, 1 Manushya, 2 Rakshasa; points indexed [boy][girl]
+GANA = [0, 1, 2, 1, 0, 1, 0, 0, 2, 2, 1, 1, 0, 2, 0, 2, 0, 2, 2, 1, 1, 0, 2, 2, 1, 1, 0]
+GANA_POINTS = [[6, 6, 1], [5, 6, 0], [1, 0, 6]]
+
+# Nadi by nakshatra: Adi, Madhya, Antya repeating forwards and backwards
+NADI = [(0, 1, 2, 2, 1, 0)[n % 6] for n in range(27)]
+
+# Bhakoot: sign distances (girl to boy, counted inclusively) that score nothing
+BHAKOOT_DOSHA = {2, 12, 5, 9, 6, 8}
+
+def _relation(lord, other):
+    if lord == other or other in FRIENDS[lord]:
+        return "friend"
+    return "enemy" if other in ENEMIES[lord] else "neutral"
+
+def _maitri(boy_lord, girl_lord):
+    pair = sorted([_relation(boy_lord, girl_lord), _relation(girl_lord, boy_lord)],
+                  key=["friend", "neutral", "enemy"].index)
+    return MAITRI_POINTS[tuple(pair)]
+
+def _tara_good(from_nak, to_nak):
+    # Janma..Ati-mitra cycle of nine; Vipat (3), Pratyak (5) and Vadha (7) are inauspicious
+    return ((to_nak - from_nak) % 27 + 1) % 9 not in (3, 5, 7)
+
+def _koota_points(koota, boy, girl):
+    boy_nak, girl_nak = boy // 4, girl // 4
+    boy_sign, girl_sign = boy // 9, girl // 9
+    if koota == "varna":
+        return 1 if VARNA[boy_sign] >= VARNA[girl_sign] else 0
+    if koota == "vashya":
+        return VASHYA_POINTS[VASHYA[boy_sign]][VASHYA[girl_sign]]
+    if koota == "tara":
+        return 1.5 * _tara_good(girl_nak, boy_nak) + 1.5 * _tara_good(boy_nak, girl_nak)
+    if koota == "yoni":
+        return YONI_POINTS[YONI[boy_nak]][YONI[girl_nak]]
+    if koota == "graha_maitri":
+        return _maitri(RASHI_LORDS[boy_sign], RASHI_LORDS[girl_sign])
+    if koota == "gana":
+        return GANA_POINTS[GANA[boy_nak]][GANA[girl_nak]]
+    if koota == "bhakoot":
+        return 0 if (boy_sign - girl_sign) % 12 + 1 in BHAKOOT_DOSHA else 7
+    if koota == "nadi":
+        return 0 if NADI[boy_nak] == NADI[girl_nak] else 8
+
+# Kootas scored on the two Moon signs; the rest depend on the two nakshatras only
+SIGN_KOOTAS = {"varna", "vashya", "graha_maitri", "bhakoot"}
+
+def _koota_matrix(koota):
+    # Scores the 12x12 (sign) or 27x27 (nakshatra) table once and expands it to keys
+    unit = 9 if koota in SIGN_KOOTAS else 4
+    size = KEYS // unit
+    table = np.array([[_koota_points(koota, boy * unit, girl * unit) for girl in range(size)]
+                      for boy in range(size)], dtype=np.float32)
+    units = np.arange(KEYS) // unit
+    return table[np.ix_(units, units)]
+
+# (boy key, girl key) -> points, one 108x108 matrix per koota plus their total, built at import
+KOOTA_MATRICES = {koota: _koota_matrix(koota) for koota in KOOTAS}
+TOTAL_MATRIX = sum(KOOTA_MATRICES.values())
+
+def match_key(nakshatra: int, pada: int):
+    # nakshatra 0-26, pada 1-4
+    return nakshatra * 4 + pada - 1
+
+def is_manglik(mars_house: int):
+    return mars_house in MANGLIK_HOUSES
+
+def describe_key(key: int):
+    return {"moon_sign": RASHIS[key // 9], "nakshatra": NAKSHATRAS[key // 4], "charan": key % 4 + 1}
+
+def koota_breakdown(boy_key: int, girl_key: int):
+    kootas = {koota: float(KOOTA_MATRICES[koota][boy_key, girl_key]) for koota in KOOTAS}
+    return {"score": float(TOTAL_MATRIX[boy_key, girl_key]), "max_score": MAX_SCORE, "kootas": kootas}
+
+def score_row(key: int, gender: str):
+    # Total points of a profile against every key of the opposite gender
+    if gender == "male":
+        return TOTAL_MATRIX[key]
+    if gender == "female":
+        return TOTAL_MATRIX[:, key]
+    raise ValueError(f"Unknown gender: {gender}")
+
+class MatchPool:
+    """Stored profiles reduced to their match keys, for scoring one profile against all of them.
+
+    Candidates are grouped by key, so a query costs one 108-entry score row plus one
+    array copy per key group it reads, however large the pool. With a path the pool is
+    loaded from and appended to an id,gender,key,mars_house CSV.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = []
+        self._genders = []
+        self._keys = []
+        self._mars_houses = []
+        self._groups = None  # gender -> list of 108 index arrays, rebuilt after adds
+        if path and os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self._append(row["id"], row["gender"], int(row["key"]), int(row["mars_house"]))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _append(self, profile_id, gender, key, mars_house):
+        if gender not in ("male", "female"):
+            raise ValueError(f"Unknown gender: {gender}")
+        if not 0 <= key < KEYS:
+            raise ValueError(f"Match key out of range: {key}")
+        self._ids.append(profile_id)
+        self._genders.append(gender)
+        self._keys.append(key)
+        self._mars_houses.append(mars_house)
+
+    def add_many(self, profiles):
+        # profiles: iterable of (id, gender, key, mars_house)
+        profiles = list(profiles)
+        with self._lock:
+            for profile in profiles:
+                self._append(*profile)
+            self._groups = None
+            if self.path:
+                new_file = not os.path.exists(self.path)
+                with open(self.path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if new_file:
+                        writer.writerow(["id", "gender", "key", "mars_house"])
+                    writer.writerows(profiles)
+
+    def add(self, profile_id, gender: str, key: int, mars_house: int):
+        self.add_many([(profile_id, gender, key, mars_house)])
+
+    def _index(self):
+        with self._lock:
+            if self._groups is None:
+                keys = np.array(self._keys, dtype=np.int16)
+                genders = np.array(self._genders)
+                self._key_array = keys
+                self._manglik_array = np.isin(np.array(self._mars_houses, dtype=np.int8), list(MANGLIK_HOUSES))
+                self._groups = {}
+                for gender in ("male", "female"):
+                    members = np.nonzero(genders == gender)[0]
+                    order = members[np.argsort(keys[members], kind="stable")]
+                    bounds = np.searchsorted(keys[order], np.arange(KEYS + 1))
+                    self._groups[gender] = [order[bounds[k]:bounds[k + 1]] for k in range(KEYS)]
+            return self._groups, self._key_array, self._manglik_array
+
+    def top_matches(self, key: int, gender: str, mars_house: int = None, k: int = 10,
+                    min_score: float = 0, manglik_match: bool = False):
+        """Best k candidates of the opposite gender, highest score first.
+
+        manglik_match keeps only candidates whose Mars dosha status equals the query's
+        (needs mars_house). Ties keep insertion order.
+        """
+        row = score_row(key, gender)
+        groups, keys, manglik = self._index()
+        candidates = groups["female" if gender == "male" else "male"]
+        query_manglik = is_manglik(mars_house) if mars_house is not None else None
+        results = []
+        # Every member of a key group has the same score: walk the scores best first, merging
+        # the groups that share one back into insertion order
+        for score in np.unique(row)[::-1].tolist():
+            if score < min_score or len(results) >= k:
+                break
+            members = np.sort(np.concatenate([candidates[g] for g in np.flatnonzero(row == score)]))
+            if manglik_match and query_manglik is not None:
+                members = members[manglik[members] == query_manglik]
+            for i in members[:k - len(results)].tolist():
+                group_key = int(keys[i])
+                boy, girl = (key, group_key) if gender == "male" else (group_key, key)
+                results.append({
+                    "id": self._ids[i],
+                    "manglik": bool(manglik[i]),
+                    **describe_key(group_key),
+                    **koota_breakdown(int(boy), int(girl)),
+                })
+        return results
+
+    def scores(self, key: int, gender: str):
+        # Scores of every stored profile of the opposite gender, in insertion order
+        row = score_row(key, gender)
+        groups, keys, _ = self._index()
+        other = "female" if gender == "male" else "male"
+        members = np.sort(np.concatenate(groups[other]))
+        return [self._ids[i] for i in members.tolist()], row[keys[members]]
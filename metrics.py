@@ -0,0 +1,103 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds; a stage runs from microseconds (table lookups) to seconds (Nominatim)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request breakdown for the X-Timing header: (name, seconds) pairs, or None when the
+# request did not ask for it. Set by the HTTP middleware; threadpool endpoints inherit it.
+request_timings = ContextVar("request_timings", default=None)
+
+REGISTRY = []
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}  # label values -> [bucket counts, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(counts), total) for values, (counts, total) in self._series.items()]
+        for values, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _labels(self.labels + ("le",), values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+class GaugeFunc:
+    """Gauge read at scrape time: fn() returns {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, labels, fn):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for values, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(value)}")
+        return lines
+
+def render():
+    # Prometheus text exposition format 0.0.4
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+def record_timing(name: str, seconds: float):
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+@contextmanager
+def timed(histogram: Histogram, *label_values):
+    # Observes the block's wall time, and adds it to the X-Timing breakdown when one is active
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, *label_values)
+        record_timing(":".join(str(v) for v in label_values) or histogram.name, elapsed)
+
+def timing_header(timings):
+    # Server-Timing syntax, durations in milliseconds
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings)
+
+STAGE_SECONDS = Histogram(
+    "kundli_stage_seconds", "Time spent in each KundliCalculator stage", labels=("stage",)
+)
+UPSTREAM_SECONDS = Histogram(
+    "prokerala_request_seconds", "Prokerala API call latency by endpoint and HTTP status",
+    labels=("endpoint", "status"),
+)
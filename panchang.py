@@ -0,0 +1,141 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import numpy as np
+import swisseph as swe
+import ephemeris
+from timezones import zone
+from kundli_calculator import NAKSHATRAS, TITHIS, YOGAS, KARANAS
+
+# Degrees of the driving quantity per element: tithi and karana run on the Moon-Sun
+# elongation, nakshatra on the Moon's sidereal longitude, yoga on Moon + Sun
+LIMBS = {"tithi": 12.0, "nakshatra": ephemeris.NAKSHATRA_SPAN, "yoga": ephemeris.NAKSHATRA_SPAN, "karana": 6.0}
+
+# Coarse sampling step: the elongation gains under 14.5 degrees a day and Moon + Sun
+# under 17, so each step holds at most one karana (6 deg) or yoga (13.3 deg) boundary
+GRID_STEP_DAYS = 1.0 / 3
+
+# An element can outlast a day; the search window is padded so the elements of the
+# first and last day get exact start and end times too
+MARGIN_DAYS = 2.0
+
+MAX_DAYS = 366 * 2
+
+def _luminaries(jd):
+    # Longitudes only: speeds are not needed inside the root finder. swisseph settings
+    # are per thread, so Lahiri mode is applied here rather than assumed.
+    ephemeris.ensure_configured()
+    ayan = swe.get_ayanamsa(jd)
+    return (swe.calc_ut(jd, swe.SUN, swe.FLG_SWIEPH)[0][0] - ayan,
+            swe.calc_ut(jd, swe.MOON, swe.FLG_SWIEPH)[0][0] - ayan)
+
+def _quantity(limb, sun, moon):
+    if limb in ("tithi", "karana"):
+        return (moon - sun) % 360
+    if limb == "nakshatra":
+        return moon % 360
+    return (moon + sun) % 360
+
+def _boundary_time(limb, edge, a, b, qa, qb):
+    # qa, qb: the quantity at the bracket ends, already known from the grid
+    def f(t):
+        sun, moon = _luminaries(t)
+        return ephemeris.wrap(_quantity(limb, sun, moon) - edge)
+    return ephemeris.find_root(f, a, b, ephemeris.wrap(qa - edge), ephemeris.wrap(qb - edge))
+
+def limb_spans(start_jd, end_jd, limbs=LIMBS):
+    """(start_jd, end_jd, index) spans of each limb covering [start_jd, end_jd).
+
+    The luminaries are sampled once on a coarse grid; each element change between two
+    samples is refined to the second by root finding. The first and last span of each
+    limb are clipped to the range.
+    """
+    steps = int(np.ceil((end_jd - start_jd) / GRID_STEP_DAYS))
+    grid = start_jd + np.arange(steps + 1) * GRID_STEP_DAYS
+    positions = ephemeris.planet_positions(grid, ephemeris.LUMINARIES)
+    ayan = ephemeris.ayanamsha(grid)
+    sun = ephemeris.sidereal(positions[:, 0, ephemeris.LON], ayan)
+    moon = ephemeris.sidereal(positions[:, 1, ephemeris.LON], ayan)
+    quantities = {}
+    # Every tithi boundary is also a karana boundary: tithis are merged karana pairs
+    for limb in limbs:
+        solve = "karana" if limb == "tithi" else limb
+        if solve not in quantities:
+            quantities[solve] = _solve(solve, grid, _quantity(solve, sun, moon), start_jd, end_jd)
+    return {limb: _merge_halves(quantities["karana"]) if limb == "tithi" else quantities[limb] for limb in limbs}
+
+def _solve(limb, grid, quantity, start_jd, end_jd):
+    width = LIMBS[limb]
+    index = (quantity // width).astype(int) % round(360 / width)
+    current, start = int(index[0]), start_jd
+    spans = []
+    for i in np.nonzero(index[1:] != index[:-1])[0]:
+        t = float(_boundary_time(limb, index[i + 1] * width, grid[i], grid[i + 1], quantity[i], quantity[i + 1]))
+        if t >= end_jd:
+            break
+        spans.append((start, t, current))
+        current, start = int(index[i + 1]), t
+    spans.append((start, end_jd, current))
+    return spans
+
+def _merge_halves(karana_spans):
+    # Half-tithi spans -> tithi spans (tithi = half-tithi // 2)
+    merged = []
+    for start, end, half in karana_spans:
+        if merged and merged[-1][2] == half // 2:
+            merged[-1] = (merged[-1][0], end, half // 2)
+        else:
+            merged.append((start, end, half // 2))
+    return merged
+
+def _element(limb, index):
+    if limb == "tithi":
+        return {"number": index + 1, "name": TITHIS[index % 15], "paksha": "Shukla" if index < 15 else "Krishna"}
+    if limb == "nakshatra":
+        return {"name": NAKSHATRAS[index]}
+    if limb == "yoga":
+        return {"name": YOGAS[index]}
+    return {"name": KARANAS[int(ephemeris.karana_of_half_tithi(index))]}
+
+def daily_panchang(lat, lon, timezone_str, start_date: str, days: int):
+    """Panchang for days local calendar days from start_date (YYYY-MM-DD).
+
+    A panchang day runs from sunrise to the next sunrise (local midnight where the Sun
+    does not rise); each limb lists every element in effect during it, with exact local
+    start and end times.
+    """
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+    first = datetime.strptime(start_date, "%Y-%m-%d")
+    dates = [(first + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days + 1)]
+    sun_events = [ephemeris.sunrise_sunset(lat, lon, timezone_str, day) for day in dates]
+    bounds = [
+        sunrise if sunrise is not None else ephemeris.local_midnight_jd(timezone_str, day)
+        for day, (sunrise, _) in zip(dates, sun_events)
+    ]
+    spans = limb_spans(bounds[0] - MARGIN_DAYS, bounds[-1] + MARGIN_DAYS)
+    starts = {limb: [span[0] for span in limb_list] for limb, limb_list in spans.items()}
+
+    tz = zone(timezone_str)
+    formatted = {None: None}
+
+    def local(jd):
+        # Boundaries are shared by neighbouring elements and days; format each once
+        if jd not in formatted:
+            formatted[jd] = ephemeris.jd_to_datetime(jd).astimezone(tz).isoformat()
+        return formatted[jd]
+
+    calendar = []
+    for d in range(days):
+        day_start, day_end = bounds[d], bounds[d + 1]
+        sunrise, sunset = sun_events[d]
+        entry = {"date": dates[d], "sunrise": local(sunrise), "sunset": local(sunset)}
+        for limb, limb_list in spans.items():
+            first_span = bisect_right(starts[limb], day_start) - 1
+            last_span = bisect_right(starts[limb], day_end, lo=first_span)
+            entry[limb] = [
+                {**_element(limb, index), "start": local(start), "end": local(end)}
+                for start, end, index in limb_list[first_span:last_span]
+                if end > day_start and start < day_end
+            ]
+        calendar.append(entry)
+    return calendar
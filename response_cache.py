@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Upstream output for a fixed parameter tuple never changes
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def cache_key(*parts):
+    # Canonical form of the parameter tuple: same values -> same key regardless of dict order
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def make_etag(body: bytes):
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+class ResponseCache:
+    """Two-tier bytes cache: an in-process LRU in front of a size-bounded directory.
+
+    With no directory only the memory tier is used. Disk entries are evicted least
+    recently used first once their total size exceeds max_disk_bytes.
+    """
+
+    def __init__(self, directory: str = None, max_memory_entries: int = 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _remember(self, key, body):
+        self._memory[key] = body
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        # File I/O happens outside the lock, so memory hits never wait on the disk
+        with self._lock:
+            body = self._memory.get(key)
+            if body is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return body
+            if key not in self._disk:
+                self.misses += 1
+                return None
+        try:
+            with open(self._path(key), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                if key in self._disk:
+                    self._disk_bytes -= self._disk.pop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, body)
+            self.disk_hits += 1
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+        return body
+
+    def put(self, key: str, body: bytes):
+        with self._lock:
+            self._remember(key, body)
+        if not self.directory or len(body) > self.max_disk_bytes:
+            return
+        # Per-thread temp file: concurrent puts of one key must not share it
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, self._path(key))
+        evicted = []
+        with self._lock:
+            self._disk_bytes += len(body) - self._disk.pop(key, 0)
+            self._disk[key] = len(body)
+            while self._disk_bytes > self.max_disk_bytes:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    async def get_async(self, key: str):
+        # For the event loop: memory hits and misses are answered inline, disk reads
+        # run in a worker thread
+        with self._lock:
+            on_disk = key in self._disk and key not in self._memory
+        if on_disk:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def put_async(self, key: str, body: bytes):
+        if self.directory:
+            await asyncio.to_thread(self.put, key, body)
+        else:
+            self.put(key, body)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
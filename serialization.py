@@ -0,0 +1,90 @@
+"""Response encoding: orjson for JSON when installed, MessagePack when the client asks.
+
+Both produce the same document the stdlib/jsonable_encoder path did (datetimes as ISO
+strings, numpy values as plain numbers), without walking it through jsonable_encoder
+first. Neither library is required: JSON falls back to the stdlib encoder, and
+MessagePack is only offered when msgpack is installed.
+"""
+import json
+from datetime import date, datetime, time
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Names clients send for MessagePack; answers always use MSGPACK_MEDIA_TYPE
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+def _default(obj):
+    # Everything the result dicts hold beyond JSON types: numpy scalars/arrays, dates
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_json(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps_json(obj) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+def dumps_msgpack(obj) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("MessagePack output needs msgpack: pip install msgpack")
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+def wants_msgpack(accept: str) -> bool:
+    # True when the Accept header prefers a MessagePack type over JSON (by q-value, then
+    # order); */* and missing headers get JSON
+    if msgpack is None or not accept:
+        return False
+    best_json = best_msgpack = 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MSGPACK_MEDIA_TYPES:
+            best_msgpack = max(best_msgpack, q)
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            best_json = max(best_json, q)
+    return best_msgpack > best_json
+
+def encode(obj, accept: str = None):
+    # -> (body bytes, media type) in the format the Accept header negotiates
+    if wants_msgpack(accept):
+        return dumps_msgpack(obj), MSGPACK_MEDIA_TYPE
+    return dumps_json(obj), JSON_MEDIA_TYPE
+
+def negotiated_response(obj, accept: str = None, status_code: int = 200):
+    body, media_type = encode(obj, accept)
+    # Same URL, two representations: caches must key on Accept
+    return Response(content=body, status_code=status_code, media_type=media_type, headers={"Vary": "Accept"})
+
+class FastJSONResponse(JSONResponse):
+    # Default response class: routes that return plain dicts still pass through
+    # jsonable_encoder, but the final encoding is dumps_json
+    def render(self, content) -> bytes:
+        return dumps_json(content)
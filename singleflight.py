@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving while it
+    is in flight wait for and share its result or exception. Nothing is kept once the
+    call finishes, so this bounds duplicate work during spikes without being a cache.
+    do() is for threads (sync FastAPI routes run in the threadpool); do_async() for
+    coroutines on one event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return call.wait()
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            self.leaders += 1
+            # A task of its own: a disconnecting leader must not cancel the followers' result
+            task = self._tasks[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KUNDLI_POOL_WORKERS", "1")
+
+DELHI = (28.6139, 77.2090, "Asia/Kolkata")
+BIRTH = {"dob": "1990-01-01", "tob": "10:30:00", "place": "Delhi, India"}
+
+@pytest.fixture(scope="session")
+def app_module():
+    import main
+    # Every test place resolves to Delhi: no Nominatim calls
+    main.kundli_calc.geocode_place = lambda place: DELHI
+    return main
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+    # Not entered as a context manager: the lifespan (warm-up thread, pool shutdown) stays off
+    return TestClient(app_module.app)
@@ -0,0 +1,118 @@
+import asyncio
+import httpx
+import pytest
+from api import AsyncProkeralaClient
+
+PARAMS = (1, "23.1765,75.7885", "2022-03-17T10:50:40+00:00")
+
+class Upstream:
+    """Mock Prokerala: issues numbered tokens and records every request it serves."""
+
+    def __init__(self, expires_in=3600, revoked=(), statuses=None, delay=0.0):
+        self.expires_in = expires_in
+        self.revoked = set(revoked)
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.tokens = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        if request.url.path == "/token":
+            self.tokens += 1
+            return httpx.Response(200, json={"access_token": f"token-{self.tokens}", "expires_in": self.expires_in})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if request.headers["Authorization"].split()[-1] in self.revoked:
+            return httpx.Response(401, json={"errors": ["token revoked"]})
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0), json={"errors": ["upstream"]})
+        return httpx.Response(200, json={"path": request.url.path, "params": dict(request.url.params)})
+
+    def calls(self, path):
+        return [r for r in self.requests if r.url.path == path]
+
+def run(upstream, calls, **options):
+    # Runs calls(client) on a client backed by upstream, closing it afterwards
+    async def main():
+        client = AsyncProkeralaClient("id", "secret", base_url="https://mock",
+                                      transport=httpx.MockTransport(upstream), **options)
+        try:
+            return await calls(client)
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+def test_kundli_request_carries_token_and_params():
+    upstream = Upstream()
+    result = run(upstream, lambda client: client.get_kundli(*PARAMS))
+    assert result == {"path": "/v2/astrology/kundli",
+                      "params": {"ayanamsa": "1", "coordinates": PARAMS[1], "datetime": PARAMS[2]}}
+    (token_request,) = upstream.calls("/token")
+    assert b"grant_type=client_credentials" in token_request.content
+    assert upstream.calls("/v2/astrology/kundli")[0].headers["Authorization"] == "Bearer token-1"
+
+def test_token_is_reused_until_it_nears_expiry():
+    upstream = Upstream(expires_in=3600)
+
+    async def calls(client):
+        await asyncio.gather(*(client.get_kundli(*PARAMS) for _ in range(5)))
+        await client.get_kundli_advanced(*PARAMS)
+    run(upstream, calls)
+    assert upstream.tokens == 1
+
+def test_token_inside_the_refresh_margin_is_refreshed():
+    upstream = Upstream(expires_in=30)
+
+    async def calls(client):
+        await client.get_kundli(*PARAMS)
+        await client.get_kundli(*PARAMS)
+    run(upstream, calls, token_refresh_margin=60)
+    assert upstream.tokens == 2
+    assert [r.headers["Authorization"] for r in upstream.calls("/v2/astrology/kundli")] == \
+        ["Bearer token-1", "Bearer token-2"]
+
+def test_revoked_token_is_refreshed_and_the_call_retried_once():
+    upstream = Upstream(revoked={"token-1"})
+    result = run(upstream, lambda client: client.get_chart(*PARAMS, "rasi", "north-indian", "svg"))
+    assert '"/v2/astrology/chart"' in result
+    assert upstream.tokens == 2
+    assert [r.headers["Authorization"] for r in upstream.calls("/v2/astrology/chart")] == \
+        ["Bearer token-1", "Bearer token-2"]
+
+def test_second_401_is_raised():
+    upstream = Upstream(revoked={"token-1", "token-2"})
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        run(upstream, lambda client: client.get_kundli(*PARAMS))
+    assert error.value.response.status_code == 401
+    assert len(upstream.calls("/v2/astrology/kundli")) == 2
+
+def test_server_error_is_raised_without_retry():
+    upstream = Upstream(statuses=[503])
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        run(upstream, lambda client: client.get_kundli(*PARAMS))
+    assert error.value.response.status_code == 503
+    assert len(upstream.calls("/v2/astrology/kundli")) == 1
+
+def test_timeout_propagates():
+    def handler(request):
+        if request.url.path == "/token":
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+        raise httpx.ReadTimeout("upstream too slow", request=request)
+    with pytest.raises(httpx.TimeoutException):
+        run(handler, lambda client: client.get_kundli(*PARAMS))
+
+def test_in_flight_requests_are_capped():
+    upstream = Upstream(delay=0.01)
+
+    async def calls(client):
+        await asyncio.gather(*(client.get_kundli(*PARAMS) for _ in range(12)))
+    run(upstream, calls, max_concurrency=3)
+    assert len(upstream.calls("/v2/astrology/kundli")) == 12
+    assert upstream.max_in_flight == 3
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from api import AsyncProkeralaClient
+from response_cache import ResponseCache, cache_key, etag_matches, make_etag
+from singleflight import SingleFlight
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow, 21)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow, 21))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    wait_until(lambda: flight.stats()["followers"] == 4)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    assert results == [42] * 5
+    assert calls == [21]
+    assert flight.stats() == {"leaders": 1, "followers": 4, "in_flight": 0}
+    # Finished calls are not cached
+    assert flight.do("k", lambda: "again") == "again"
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    wait_until(lambda: flight.stats()["followers"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("k", fetch, "v") for _ in range(5)))
+    assert asyncio.run(main()) == ["v"] * 5
+    assert calls == ["v"]
+    assert flight.stats()["in_flight"] == 0
+
+def test_cache_key_ignores_dict_order():
+    assert cache_key("chart", {"a": 1, "b": 2}) == cache_key("chart", {"b": 2, "a": 1})
+    assert cache_key("chart", 1) != cache_key("chart", "1 ")
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ("*", True),
+    ('"other"', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_memory_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.put("c", b"3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (b"1", b"3")
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+def test_disk_tier_survives_restart_and_stays_within_its_budget(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_memory_entries=1, max_disk_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    assert cache.stats()["disk_hits"] == 1
+    cache.put("c", b"cccc")
+    # a was read last, so b went first
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "c"]
+    reopened = ResponseCache(str(tmp_path))
+    assert reopened.stats()["disk_bytes"] == 8
+    assert asyncio.run(reopened.get_async("c")) == b"cccc"
+    asyncio.run(reopened.put_async("d", b"dd"))
+    assert (tmp_path / "d").read_bytes() == b"dd"
+
+@pytest.fixture
+def prokerala_app(app_module, monkeypatch):
+    # /prokerala/* backed by a mock upstream and empty caches
+    upstream_calls = []
+
+    def handler(request):
+        if request.url.path == "/token":
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+        upstream_calls.append(request)
+        return httpx.Response(200, json={"kundli": dict(request.url.params)})
+
+    monkeypatch.setattr(app_module, "prokerala", AsyncProkeralaClient(
+        "id", "secret", base_url="https://mock", transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(app_module, "response_cache", ResponseCache())
+    return upstream_calls
+
+def test_prokerala_kundli_is_fetched_once_and_revalidated_with_etag(client, prokerala_app):
+    params = {"coordinates": "23.1765,75.7885", "datetime_str": "2022-03-17T10:50:40+00:00"}
+    first = client.get("/prokerala/kundli", params=params)
+    assert first.status_code == 200
+    assert first.json()["data"]["kundli"]["coordinates"] == params["coordinates"]
+    assert first.headers["ETag"] == make_etag(first.content)
+    assert "immutable" in first.headers["Cache-Control"]
+    again = client.get("/prokerala/kundli", params=params)
+    assert again.content == first.content
+    revalidated = client.get("/prokerala/kundli", params=params, headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+    assert len(prokerala_app) == 1
@@ -0,0 +1,59 @@
+import pytest
+from conftest import BIRTH
+from dasha import DASHA_LORDS, MAX_DEPTH, TOTAL_YEARS, YEAR_DAYS, VimshottariDasha
+
+BIRTH_JD = 2447893.0
+
+@pytest.fixture
+def dasha():
+    return VimshottariDasha(moon_sidereal=123.4, birth_jd=BIRTH_JD)
+
+def test_mahadashas_cover_one_cycle_in_sequence(dasha):
+    periods = dasha.mahadashas()
+    assert [p.lord for p in periods] == [(dasha.birth_lord + k) % 9 for k in range(9)]
+    assert periods[0].start <= BIRTH_JD < periods[0].end
+    assert periods[-1].end - periods[0].start == pytest.approx(TOTAL_YEARS * YEAR_DAYS)
+    for before, after in zip(periods, periods[1:]):
+        assert before.end == pytest.approx(after.start)
+
+def test_children_tile_their_parent(dasha):
+    period = dasha.mahadashas()[3]
+    children = period.children()
+    assert children[0].lord == period.lord
+    assert children[0].start == period.start
+    assert children[-1].end == pytest.approx(period.end)
+    assert all(child.level == period.level + 1 for child in children)
+
+def test_active_at_matches_the_expanded_tree(dasha):
+    jd = BIRTH_JD + 12345.6
+    active = dasha.active_at(jd, MAX_DEPTH)
+    assert len(active) == MAX_DEPTH
+    period = dasha.find([DASHA_LORDS[p.lord] for p in active])
+    assert (period.start, period.end) == (active[-1].start, active[-1].end)
+    assert period.start <= jd < period.end
+
+@pytest.mark.parametrize("lords", [[], ["Venus"] * (MAX_DEPTH + 1)])
+def test_find_rejects_path_length(dasha, lords):
+    with pytest.raises(ValueError):
+        dasha.find(lords)
+
+def test_find_rejects_unknown_lord(dasha):
+    with pytest.raises(ValueError, match="Unknown dasha lord"):
+        dasha.find(["Pluto"])
+
+def test_full_tree_past_the_cap_is_rejected(client):
+    response = client.post("/dasha", json=BIRTH, params={"depth": 5})
+    assert response.status_code == 400
+    assert "pass path=" in response.json()["detail"]
+
+def test_one_branch_at_full_depth_is_accepted(client):
+    response = client.post("/dasha", json=BIRTH, params={"depth": 5, "path": "Venus"})
+    assert response.status_code == 200
+    (root,) = response.json()["periods"]
+    assert (root["lord"], root["level"]) == ("Venus", "mahadasha")
+    # Venus and the four levels below it
+    node, levels = root, 1
+    while "periods" in node:
+        assert len(node["periods"]) == 9
+        node, levels = node["periods"][0], levels + 1
+    assert levels == MAX_DEPTH
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+import electional
+import ephemeris
+
+def brute_force_windows(constraint, start_jd, end_jd, step_days):
+    # Runs of the constraint on a fine fixed grid, as (first, last) sample jds
+    grid = np.arange(start_jd, end_jd, step_days)
+    inside = constraint.holds(grid)
+    edges = np.flatnonzero(np.diff(inside.astype(np.int8)))
+    starts = ([0] if inside[0] else []) + list(edges[~inside[edges]] + 1)
+    ends = list(edges[inside[edges]]) + ([len(grid) - 1] if inside[-1] else [])
+    return [(grid[a], grid[b]) for a, b in zip(starts, ends)]
+
+@pytest.mark.parametrize("latitude", [66.0, -66.0, 28.6])
+@pytest.mark.parametrize("sign", ["Aries", "Pisces", "Aquarius", "Leo"])
+def test_ascendant_windows_match_brute_force(latitude, sign):
+    constraint = electional.Constraint("ascendant", [sign], site=(latitude, 25.0))
+    start_jd = ephemeris.datetime_to_jd(ephemeris.J2000) + 8400
+    end_jd = start_jd + 10
+    step = 15 / 86400
+    expected = brute_force_windows(constraint, start_jd, end_jd, step)
+    found = electional.find_windows(start_jd, end_jd, [constraint])
+    assert len(found) == len(expected)
+    for (a, b), (first, last) in zip(found, expected):
+        # Bisected edges fall within one brute-force sample of the scanned runs
+        assert first - step - ephemeris.TOLERANCE_DAYS <= a <= first + ephemeris.TOLERANCE_DAYS
+        assert last - ephemeris.TOLERANCE_DAYS <= b <= last + step + ephemeris.TOLERANCE_DAYS
+
+def test_ascendant_step_follows_latitude():
+    assert electional.shortest_sign_rise_days(66.0) < electional.shortest_sign_rise_days(28.6)
+    assert electional.shortest_sign_rise_days(-50.0) == electional.shortest_sign_rise_days(50.0)
+
+def test_ascendant_beyond_supported_latitude_is_rejected():
+    with pytest.raises(electional.UnsupportedLatitude):
+        electional.Constraint("ascendant", ["Aries"], site=(70.0, 25.0))
+
+@pytest.mark.parametrize("body", ["Sun", "Moon", "Rahu", "Ketu"])
+def test_retrograde_is_rejected_for_bodies_the_kundli_never_marks(body):
+    with pytest.raises(ValueError, match="retrograde applies to"):
+        electional.Constraint("retrograde", [True], body=body)
+
+def test_retrograde_windows_follow_the_planet_speed():
+    # Mercury turned retrograde on 2024-04-01 and direct again on 2024-04-25 (UTC)
+    constraint = electional.Constraint("retrograde", [True], body="Mercury")
+    start_jd = ephemeris.datetime_to_jd(datetime(2024, 3, 1, tzinfo=timezone.utc))
+    ((a, b),) = electional.find_windows(start_jd, start_jd + 90, [constraint])
+    assert ephemeris.jd_to_datetime(a).date().isoformat() == "2024-04-01"
+    assert ephemeris.jd_to_datetime(b).date().isoformat() == "2024-04-25"
+
+def test_retrograde_sun_is_a_bad_request(client):
+    response = client.post("/electional", json={
+        "start": "2024-01-01", "days": 30, "latitude": 28.6, "longitude": 77.2,
+        "constraints": [{"quantity": "retrograde", "body": "Sun", "values": [True]}],
+    })
+    assert response.status_code == 400
+    assert "retrograde applies to" in response.json()["detail"]
@@ -0,0 +1,32 @@
+from conftest import DELHI
+from ingest import prepare
+
+class Calc:
+    # Geocodes Delhi only, counting lookups
+    def __init__(self):
+        self.lookups = []
+
+    def geocode_place(self, place):
+        self.lookups.append(place)
+        if place != "Delhi":
+            raise ValueError(f"Could not geocode place: {place}")
+        return DELHI
+
+def record(i, place):
+    return {"id": i, "dob": "1990-01-01", "tob": "10:30:00", "place": place}
+
+def test_failed_places_are_looked_up_once_per_run():
+    calc, failed = Calc(), {}
+    prepared = [prepare(calc, record(i, place), failed)
+                for i, place in enumerate(["Atlantis", "Delhi", "Atlantis", "Atlantis"])]
+    assert calc.lookups == ["Atlantis", "Delhi"]
+    errors = [row["error"] for row, item in prepared if item is None]
+    assert errors == ["Could not geocode place: Atlantis"] * 3
+    assert prepared[1][1] == ("1990-01-01", "10:30:00", "Delhi", DELHI)
+
+def test_coordinates_skip_geocoding():
+    calc = Calc()
+    calc.resolve_location = lambda lat, lon, tz: (lat, lon, tz)
+    row, item = prepare(calc, dict(record(0, None), latitude="28.6", longitude="77.2", timezone="Asia/Kolkata"), {})
+    assert item == ("1990-01-01", "10:30:00", "28.6,77.2", (28.6, 77.2, "Asia/Kolkata"))
+    assert calc.lookups == []
@@ -0,0 +1,86 @@
+import json
+import pytest
+from conftest import BIRTH
+from datetime import datetime, timezone
+import ephemeris
+import transits
+from kundli_calculator import KUNDLI_FIELDS, RASHIS, resolve_fields
+
+DEFAULT_FIELDS = list(KUNDLI_FIELDS)
+TRANSITS_AT = "2024-03-01T00:00:00"
+
+@pytest.mark.parametrize("fields", [None, "", "  ", "\t"])
+def test_blank_fields_resolve_to_the_default_set(fields):
+    assert resolve_fields(fields) == DEFAULT_FIELDS
+
+def test_fields_are_canonicalised():
+    assert resolve_fields("planets, houses") == resolve_fields(["houses", "planets"]) == ["houses", "planets"]
+    assert resolve_fields("panchang")[:2] == ["moon_sign", "nakshatra"]
+
+@pytest.mark.parametrize("fields", [",", " , ,", []])
+def test_fields_naming_nothing_are_rejected(fields):
+    with pytest.raises(ValueError, match="No kundli fields"):
+        resolve_fields(fields)
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="Unknown kundli field"):
+        resolve_fields("planets,horoscope")
+
+def test_empty_fields_query_returns_the_default_kundli(client):
+    default = client.post("/generate_kundli", json=BIRTH)
+    empty = client.post("/generate_kundli", json=BIRTH, params={"fields": ""})
+    assert default.status_code == empty.status_code == 200
+    assert list(empty.json()["kundli"]) == DEFAULT_FIELDS
+    assert empty.content == default.content
+
+def test_default_kundli_keeps_an_empty_transits_section(client):
+    first = client.post("/generate_kundli", json=BIRTH)
+    second = client.post("/generate_kundli", json=BIRTH)
+    assert first.json()["kundli"]["transits"] == []
+    assert first.content == second.content
+
+def test_transits_by_name_need_transits_at(client):
+    with pytest.raises(ValueError, match="transits_at"):
+        resolve_fields("transits")
+    response = client.post("/generate_kundli", json=BIRTH, params={"fields": "transits"})
+    assert response.status_code == 400
+    assert "transits_at" in response.json()["detail"]
+
+def test_transits_describe_transits_at(client):
+    response = client.post("/generate_kundli", json=BIRTH,
+                           params={"fields": "transits,moon_sign", "transits_at": TRANSITS_AT})
+    assert response.status_code == 200
+    kundli = response.json()["kundli"]
+    assert list(kundli) == ["moon_sign", "transits"]
+    at = datetime.fromisoformat(TRANSITS_AT).replace(tzinfo=timezone.utc)
+    expected = transits.transit_snapshot(ephemeris.datetime_to_jd(at), RASHIS.index(kundli["moon_sign"]))
+    assert kundli["transits"] == expected
+
+OUT_OF_RANGE = {"latitude": 91.0, "longitude": 77.2, "timezone": "Asia/Kolkata"}
+
+@pytest.mark.parametrize("method, path, send", [
+    ("post", "/generate_kundli/coordinates", lambda: {"json": dict(BIRTH, **OUT_OF_RANGE)}),
+    ("get", "/chart", lambda: {"params": dict(BIRTH, **OUT_OF_RANGE)}),
+    ("post", "/electional", lambda: {"json": dict(OUT_OF_RANGE, start="2024-01-01", days=1, constraints=[
+        {"quantity": "tithi", "values": ["Shukla"]}])}),
+])
+def test_coordinates_out_of_range_are_rejected_alike(client, method, path, send):
+    response = getattr(client, method)(path, **send())
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Coordinates out of range: 91.0,77.2\n")
+
+def test_timing_header_is_opt_in(client):
+    plain = client.post("/generate_kundli", json=BIRTH, params={"fields": "planets"})
+    assert "x-timing" not in plain.headers
+    timed = client.post("/generate_kundli", json=BIRTH, params={"fields": "planets"}, headers={"X-Timing": "1"})
+    stages = [part.split(";")[0] for part in timed.headers["x-timing"].split(", ")]
+    assert "planets" in stages and stages[-1] == "total"
+    assert timed.content == plain.content
+
+def test_timing_header_on_a_stream(client):
+    response = client.post("/transits", json=BIRTH, params={"start": "2024-01-01", "end": "2024-01-10"},
+                           headers={"X-Timing": "1"})
+    assert response.status_code == 200
+    assert response.headers["x-timing"].split(", ")[-1].startswith("total;dur=")
+    lines = response.text.splitlines()
+    assert lines and all(json.loads(line) for line in lines)
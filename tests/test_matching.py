@@ -0,0 +1,83 @@
+import random
+import pytest
+import matching
+from matching import KEYS, KOOTAS, MAX_POINTS, MAX_SCORE, MatchPool, koota_breakdown, match_key
+
+PAIRS = [(boy, girl) for boy in range(0, KEYS, 5) for girl in range(0, KEYS, 7)]
+
+def test_matrices_agree_with_the_per_pair_rules():
+    for koota in KOOTAS:
+        matrix = matching.KOOTA_MATRICES[koota]
+        for boy, girl in PAIRS:
+            assert matrix[boy, girl] == matching._koota_points(koota, boy, girl), (koota, boy, girl)
+
+def test_koota_points_stay_within_their_maximum():
+    for koota in KOOTAS:
+        matrix = matching.KOOTA_MATRICES[koota]
+        assert matrix.min() >= 0 and matrix.max() == MAX_POINTS[koota]
+    assert sum(MAX_POINTS.values()) == MAX_SCORE
+    assert matching.TOTAL_MATRIX.max() <= MAX_SCORE
+
+def test_same_nakshatra_loses_nadi_and_scores_tara_fully():
+    key = match_key(3, 1)
+    kootas = koota_breakdown(key, key)["kootas"]
+    assert kootas["nadi"] == 0
+    assert kootas["tara"] == 3
+
+def test_breakdown_sums_to_the_score():
+    breakdown = koota_breakdown(17, 90)
+    assert breakdown["score"] == pytest.approx(sum(breakdown["kootas"].values()))
+    assert breakdown["max_score"] == MAX_SCORE
+
+def test_describe_key_round_trips_nakshatra_and_pada():
+    assert matching.describe_key(match_key(26, 4)) == {"moon_sign": "Pisces", "nakshatra": "Revati", "charan": 4}
+
+@pytest.fixture
+def pool():
+    rng = random.Random(7)
+    pool = MatchPool()
+    pool.add_many((f"p{i}", rng.choice(["male", "female"]), rng.randrange(KEYS), rng.randint(1, 12))
+                  for i in range(400))
+    return pool
+
+def brute_force(pool, key, gender, k, min_score=0, manglik=None):
+    # Every candidate scored one by one; ties keep insertion order
+    other = "female" if gender == "male" else "male"
+    scored = []
+    for i, (profile_id, profile_gender, profile_key, mars_house) in enumerate(
+            zip(pool._ids, pool._genders, pool._keys, pool._mars_houses)):
+        if profile_gender != other:
+            continue
+        if manglik is not None and matching.is_manglik(mars_house) != manglik:
+            continue
+        boy, girl = (key, profile_key) if gender == "male" else (profile_key, key)
+        score = float(matching.TOTAL_MATRIX[boy, girl])
+        if score >= min_score:
+            scored.append((-score, i, profile_id))
+    return [profile_id for _, _, profile_id in sorted(scored)[:k]]
+
+@pytest.mark.parametrize("gender", ["male", "female"])
+@pytest.mark.parametrize("key", [0, 41, 107])
+def test_top_matches_agree_with_brute_force(pool, key, gender):
+    found = pool.top_matches(key, gender, k=15)
+    assert [match["id"] for match in found] == brute_force(pool, key, gender, 15)
+    assert [match["score"] for match in found] == sorted((match["score"] for match in found), reverse=True)
+
+def test_top_matches_filters(pool):
+    found = pool.top_matches(41, "male", mars_house=7, k=10, min_score=20, manglik_match=True)
+    assert [match["id"] for match in found] == brute_force(pool, 41, "male", 10, min_score=20, manglik=True)
+    assert all(match["manglik"] and match["score"] >= 20 for match in found)
+
+def test_pool_reloads_from_its_csv(tmp_path):
+    path = str(tmp_path / "pool.csv")
+    pool = MatchPool(path)
+    pool.add("a", "female", 12, 7)
+    pool.add_many([("b", "female", 90, 3), ("c", "male", 5, 1)])
+    reloaded = MatchPool(path)
+    assert len(reloaded) == 3
+    assert [m["id"] for m in reloaded.top_matches(5, "male", k=5)] == [m["id"] for m in pool.top_matches(5, "male", k=5)]
+
+@pytest.mark.parametrize("profile", [("x", "other", 1, 1), ("x", "male", KEYS, 1)])
+def test_invalid_profiles_are_rejected(profile):
+    with pytest.raises(ValueError):
+        MatchPool().add(*profile)
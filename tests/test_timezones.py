@@ -0,0 +1,47 @@
+from datetime import datetime
+import pytest
+from timezones import TimezoneResolver, local_to_utc, parse_local
+
+@pytest.mark.parametrize("dob, tob, expected", [
+    ("1990-01-01", "10:30:00", datetime(1990, 1, 1, 10, 30)),
+    ("1990-1-1", "10:30:00", datetime(1990, 1, 1, 10, 30)),
+    ("1990-01-01", "1:2:3", datetime(1990, 1, 1, 1, 2, 3)),
+])
+def test_documented_and_strptime_forms_parse(dob, tob, expected):
+    assert parse_local(dob, tob) == expected
+
+@pytest.mark.parametrize("dob, tob", [
+    ("1990-01-01", "10:30"),
+    ("1990-01-01", "10:30:00+05:30"),
+    ("1990-01-01", "10:30:00Z"),
+    ("1990-01-01", "10:30:00.5"),
+    ("19900101", "10:30:00"),
+    ("1990-W01-1", "10:30:00"),
+    ("1990-02-30", "10:30:00"),
+])
+def test_other_iso_forms_are_rejected(dob, tob):
+    with pytest.raises(ValueError):
+        parse_local(dob, tob)
+
+def test_local_time_converts_with_the_place_zone():
+    assert local_to_utc("1990-01-01", "10:30:00", "Asia/Kolkata").isoformat() == "1990-01-01T05:00:00+00:00"
+    # Repeated hour at the end of US daylight saving time resolves to standard time
+    assert local_to_utc("2023-11-05", "01:30:00", "America/New_York").hour == 6
+
+class Finder:
+    # Zone by longitude band; unique_timezone_at answers for cells inside one band only
+    def __init__(self):
+        self.polygon_lookups = 0
+
+    def timezone_at(self, lng, lat):
+        self.polygon_lookups += 1
+        return "Asia/Kolkata" if lng >= 0 else "America/New_York"
+
+    def unique_timezone_at(self, lng, lat):
+        return None
+
+def test_resolver_keeps_at_most_max_cells():
+    resolver = TimezoneResolver(finder=Finder(), max_cells=3)
+    for lon in range(10):
+        assert resolver.timezone_at(10.05, lon + 0.05) == "Asia/Kolkata"
+    assert resolver.stats()["cells"] <= 3
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import vargas
+
+# Every half degree of the zodiac plus the last representable longitude of each sign
+LONGITUDES = np.concatenate([np.arange(0, 360, 0.5), np.arange(1, 13) * 30 - 1e-9])
+
+def counted(lon, segments, start):
+    # Reference for the equal-part vargas: count segments from the start sign of the rasi
+    sign, degree = int(lon // 30), lon % 30
+    return (start(sign) + int(degree * segments // 30)) % 12
+
+@pytest.mark.parametrize("varga, start", [
+    ("D1", lambda s: s),
+    ("D9", lambda s: (0, 9, 6, 3)[s % 4]),
+    ("D12", lambda s: s),
+    ("D60", lambda s: s),
+    ("D7", lambda s: s if s % 2 == 0 else s + 6),
+    ("D10", lambda s: s if s % 2 == 0 else s + 8),
+])
+def test_equal_part_vargas(varga, start):
+    segments = vargas.VARGAS[varga][1]
+    expected = [counted(lon, segments, start) for lon in LONGITUDES]
+    assert vargas.varga_signs(LONGITUDES, varga).tolist() == expected
+
+def test_navamsa_runs_continuously_through_the_zodiac():
+    # The D9 of a longitude is its 3 deg 20 min part counted from Aries
+    assert vargas.varga_signs(LONGITUDES, "D9").tolist() == [int(lon * 9 // 30) % 12 for lon in LONGITUDES]
+
+def test_drekkana_uses_the_1st_5th_and_9th_signs():
+    signs = vargas.varga_signs([0, 10, 20, 30 + 15, 60 + 25], "D3").tolist()
+    assert signs == [0, 4, 8, 5, 10]
+
+def test_hora_alternates_between_leo_and_cancer():
+    assert vargas.varga_signs([5, 20, 35, 50], "D2").tolist() == [4, 3, 3, 4]
+
+@pytest.mark.parametrize("lon, sign", [
+    (0, 0), (4.99, 0), (5, 10), (10, 8), (18, 2), (25, 6), (29.99, 6),  # Aries: odd sign
+    (30, 1), (35, 5), (42, 11), (50, 9), (55, 7),  # Taurus: even sign
+])
+def test_trimsamsa_unequal_parts(lon, sign):
+    assert vargas.varga_signs([lon], "D30")[0] == sign
+
+def test_longitudes_wrap_and_keep_their_shape():
+    grid = np.array([[360.0, -30.0], [725.0, 15.0]])
+    signs = vargas.varga_signs(grid, "D1")
+    assert signs.shape == (2, 2)
+    assert signs.tolist() == [[0, 11], [0, 0]]
+
+def test_all_varga_signs_covers_the_sixteen_charts():
+    charts = vargas.all_varga_signs([123.4, 250.0])
+    assert list(charts) == list(vargas.VARGAS)
+    assert all(((signs >= 0) & (signs < 12)).all() for signs in charts.values())
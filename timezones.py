@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+import pytz
+
+# Grid cell size in degrees (about 11 km of latitude)
+GRID_RESOLUTION = 0.1
+
+# Classified cells kept per resolver; least recently used ones are evicted beyond this
+MAX_CELLS = 500000
+
+# Index value for cells that straddle a zone boundary (or the sea): always polygon lookup
+BORDER = ""
+
+@lru_cache(maxsize=None)
+def zone(timezone_str: str):
+    # pytz zone objects are immutable; build each one once per process
+    return pytz.timezone(timezone_str)
+
+def parse_local(dob: str, tob: str):
+    # "YYYY-MM-DD", "HH:MM:SS" -> naive datetime. fromisoformat is several times faster
+    # than strptime but also takes offsets, fractions and HH:MM; it only sees input of
+    # exactly the documented shape, and strptime decides everything else (1990-1-1 passes,
+    # 10:30 and 10:30:00+05:30 do not)
+    if len(dob) == 10 and len(tob) == 8 and dob[4] == dob[7] == "-" and tob[2] == tob[5] == ":":
+        try:
+            return datetime.fromisoformat(f"{dob}T{tob}")
+        except ValueError:
+            pass
+    return datetime.strptime(f"{dob} {tob}", "%Y-%m-%d %H:%M:%S")
+
+def localize(tz, dt: datetime):
+    # pytz's public API; ambiguous and non-existent local times resolve to standard time
+    return tz.localize(dt, is_dst=False)
+
+def local_to_utc(dob: str, tob: str, timezone_str: str):
+    return localize(zone(timezone_str), parse_local(dob, tob)).astimezone(pytz.utc)
+
+class TimezoneResolver:
+    """Coordinates -> IANA zone name through a quantized lat/lon grid.
+
+    Each grid cell is classified once, from timezonefinder's unique-zone shortcut at its
+    corners and centre: cells inside a single zone answer every later lookup from the
+    index; border cells fall back to the polygon lookup. build() classifies a whole
+    region up front for bulk jobs. At most max_cells cells are kept, least recently
+    used evicted first.
+    """
+
+    def __init__(self, finder=None, resolution: float = GRID_RESOLUTION, max_cells: int = MAX_CELLS):
+        if finder is None:
+            # Imported here: timezonefinder's import alone is a noticeable share of startup
+            from timezonefinder import TimezoneFinder
+            finder = TimezoneFinder()
+        self.finder = finder
+        self.resolution = resolution
+        self.max_cells = max_cells
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+        self.index_hits = 0
+        self.polygon_lookups = 0
+
+    def _cell(self, lat, lon):
+        return int(lat // self.resolution), int(lon // self.resolution)
+
+    def _classify(self, cell):
+        south, west = cell[0] * self.resolution, cell[1] * self.resolution
+        north, east = south + self.resolution, west + self.resolution
+        samples = [(south, west), (south, east), (north, west), (north, east),
+                   (south + self.resolution / 2, west + self.resolution / 2)]
+        zones = {self.finder.unique_timezone_at(lng=lon, lat=lat) for lat, lon in samples}
+        if len(zones) == 1 and None not in zones:
+            return zones.pop()
+        return BORDER
+
+    def _remember(self, cell, name):
+        # Caller holds the lock
+        self._cells[cell] = name
+        self._cells.move_to_end(cell)
+        if len(self._cells) > self.max_cells:
+            self._cells.popitem(last=False)
+
+    def timezone_at(self, lat: float, lon: float):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            name = self._cells.get(cell)
+            if name is not None:
+                self._cells.move_to_end(cell)
+        if name is None:
+            name = self._classify(cell)
+            with self._lock:
+                self._remember(cell, name)
+        if name != BORDER:
+            with self._lock:
+                self.index_hits += 1
+            return name
+        with self._lock:
+            self.polygon_lookups += 1
+        return self.finder.timezone_at(lng=lon, lat=lat)
+
+    def build(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+        # Classify every cell of the bounding box; returns the number of border cells.
+        # A box of more than max_cells cells keeps only its last max_cells.
+        south, west = self._cell(lat_min, lon_min)
+        north, east = self._cell(lat_max, lon_max)
+        cells = {}
+        for i in range(south, north + 1):
+            for j in range(west, east + 1):
+                if (i, j) not in self._cells:
+                    cells[(i, j)] = self._classify((i, j))
+        with self._lock:
+            for cell, name in cells.items():
+                self._remember(cell, name)
+        return sum(1 for name in cells.values() if name == BORDER)
+
+    def stats(self):
+        with self._lock:
+            border = sum(1 for name in self._cells.values() if name == BORDER)
+            return {
+                "cells": len(self._cells),
+                "border_cells": border,
+                "index_hits": self.index_hits,
+                "polygon_lookups": self.polygon_lookups,
+            }
@@ -0,0 +1,145 @@
+import numpy as np
+import swisseph as swe
+import ephemeris
+from kundli_calculator import RASHIS, NAKSHATRAS
+
+# Transit bodies: (name, swisseph id, longitude offset). Ketu is Rahu + 180 degrees.
+BODIES = [
+    ("Sun", swe.SUN, 0.0),
+    ("Moon", swe.MOON, 0.0),
+    ("Mercury", swe.MERCURY, 0.0),
+    ("Venus", swe.VENUS, 0.0),
+    ("Mars", swe.MARS, 0.0),
+    ("Jupiter", swe.JUPITER, 0.0),
+    ("Saturn", swe.SATURN, 0.0),
+    ("Rahu", swe.TRUE_NODE, 0.0),
+    ("Ketu", swe.TRUE_NODE, 180.0),
+]
+BODY_NAMES = [name for name, _, _ in BODIES]
+
+# Coarse step per body in days: small enough that a body never crosses more than one
+# nakshatra (13.3 degrees) or has two stations within a step
+STEP_DAYS = {"Moon": 0.25, "Jupiter": 2.0, "Saturn": 2.0}
+DEFAULT_STEP_DAYS = 1.0
+
+# Stations are reported for the bodies that actually turn retrograde; the nodes'
+# true-motion wobble would flood the stream
+STATION_BODIES = {"Mercury", "Venus", "Mars", "Jupiter", "Saturn"}
+
+EVENT_TYPES = ("sign_ingress", "nakshatra_ingress", "station")
+
+def _sidereal_state(planet, offset, jds):
+    jds = ephemeris.julian_days(jds)
+    pos = ephemeris.planet_positions(jds, planets=(planet,))[:, 0]
+    lon = ephemeris.sidereal(pos[:, ephemeris.LON] + offset, ephemeris.ayanamsha(jds))
+    return lon, pos[:, ephemeris.SPEED]
+
+def _ingress_time(planet, offset, edge, a, b):
+    def f(t):
+        lon, _ = _sidereal_state(planet, offset, t)
+        return ephemeris.wrap(lon[0] - edge)
+    return ephemeris.find_root(f, a, b, f(a), f(b))
+
+def _station_time(planet, a, b, speed_a, speed_b):
+    def f(t):
+        _, speed = _sidereal_state(planet, 0.0, t)
+        return speed[0]
+    return ephemeris.find_root(f, a, b, speed_a, speed_b)
+
+def _segment_events(kind, name, planet, offset, count, names, grid, lon, speed, natal_moon_sign):
+    span = 360.0 / count
+    index = (lon // span).astype(int) % count
+    events = []
+    for i in np.nonzero(index[1:] != index[:-1])[0]:
+        k0, k1 = index[i], index[i + 1]
+        if (k1 - k0) % count == 1:
+            edge = k1 * span
+        elif (k0 - k1) % count == 1:
+            edge = k0 * span
+        else:
+            continue
+        jd = float(_ingress_time(planet, offset, edge, grid[i], grid[i + 1]))
+        event = {
+            "type": kind,
+            "planet": name,
+            "jd": jd,
+            "time": ephemeris.jd_to_iso(jd),
+            "from": names[k0],
+            "to": names[k1],
+            "retrograde": bool(speed[i] < 0 and speed[i + 1] < 0),
+        }
+        if kind == "sign_ingress" and natal_moon_sign is not None:
+            event["house_from_moon"] = int((k1 - natal_moon_sign) % 12) + 1
+        events.append(event)
+    return events
+
+def _station_events(name, planet, grid, lon, speed):
+    events = []
+    for i in np.nonzero(np.sign(speed[1:]) != np.sign(speed[:-1]))[0]:
+        jd = float(_station_time(planet, grid[i], grid[i + 1], speed[i], speed[i + 1]))
+        station_lon = float(_sidereal_state(planet, 0.0, jd)[0][0])
+        events.append({
+            "type": "station",
+            "planet": name,
+            "jd": jd,
+            "time": ephemeris.jd_to_iso(jd),
+            "station": "retrograde" if speed[i] > 0 else "direct",
+            "longitude": station_lon,
+            "sign": RASHIS[int(station_lon // 30) % 12],
+        })
+    return events
+
+def iter_transits(start_jd, end_jd, planets=None, event_types=EVENT_TYPES, natal_moon_sign=None,
+                  chunk_days=30.0):
+    """Yield transit events in [start_jd, end_jd) in time order.
+
+    Each body is sampled on a coarse fixed grid; every sign change, nakshatra change or
+    speed sign change between two samples is refined to the second by root finding.
+    Work is done chunk by chunk, so memory does not grow with the length of the range.
+    natal_moon_sign (0-11) adds house_from_moon to sign ingresses.
+    """
+    bodies = [b for b in BODIES if planets is None or b[0] in planets]
+    chunk_start = start_jd
+    while chunk_start < end_jd:
+        chunk_end = min(chunk_start + chunk_days, end_jd)
+        events = []
+        for name, planet, offset in bodies:
+            step = STEP_DAYS.get(name, DEFAULT_STEP_DAYS)
+            # Grid is anchored at start_jd so consecutive chunks share their edge sample
+            first = np.floor((chunk_start - start_jd) / step)
+            last = np.ceil((chunk_end - start_jd) / step)
+            grid = start_jd + np.arange(first, last + 1) * step
+            lon, speed = _sidereal_state(planet, offset, grid)
+            if "sign_ingress" in event_types:
+                events += _segment_events("sign_ingress", name, planet, offset, 12, RASHIS,
+                                          grid, lon, speed, natal_moon_sign)
+            if "nakshatra_ingress" in event_types:
+                events += _segment_events("nakshatra_ingress", name, planet, offset, 27, NAKSHATRAS,
+                                          grid, lon, speed, natal_moon_sign)
+            if "station" in event_types and name in STATION_BODIES:
+                events += _station_events(name, planet, grid, lon, speed)
+        events.sort(key=lambda e: e["jd"])
+        for event in events:
+            if chunk_start <= event["jd"] < chunk_end:
+                yield event
+        chunk_start = chunk_end
+
+def transit_snapshot(jd, natal_moon_sign=None):
+    # Sidereal position of every body at jd, relative to the natal Moon sign when given
+    chart = ephemeris.chart_arrays(jd)
+    snapshot = []
+    for name, planet, offset in BODIES:
+        i = ephemeris.PLANETS.index(planet)
+        lon = float(ephemeris.sidereal(chart["positions"][0, i, ephemeris.LON] + offset, chart["ayanamsha"])[0])
+        sign_idx = int(lon // 30) % 12
+        entry = {
+            "planet": name,
+            "longitude": lon,
+            "sign": RASHIS[sign_idx],
+            "nakshatra": NAKSHATRAS[int(lon // ephemeris.NAKSHATRA_SPAN) % 27],
+            "retrograde": bool(chart["positions"][0, i, ephemeris.SPEED] < 0),
+        }
+        if natal_moon_sign is not None:
+            entry["house_from_moon"] = (sign_idx - natal_moon_sign) % 12 + 1
+        snapshot.append(entry)
+    return snapshot
@@ -0,0 +1,81 @@
+import numpy as np
+
+# The 16 Parashari divisional charts: name -> (title, number of segments per sign)
+VARGAS = {
+    "D1": ("Rasi", 1),
+    "D2": ("Hora", 2),
+    "D3": ("Drekkana", 3),
+    "D4": ("Chaturthamsa", 4),
+    "D7": ("Saptamsa", 7),
+    "D9": ("Navamsa", 9),
+    "D10": ("Dasamsa", 10),
+    "D12": ("Dwadasamsa", 12),
+    "D16": ("Shodasamsa", 16),
+    "D20": ("Vimsamsa", 20),
+    "D24": ("Chaturvimsamsa", 24),
+    "D27": ("Saptavimsamsa", 27),
+    # Trimsamsa parts are unequal (5/5/8/7/5 degrees), so its table has one column per degree
+    "D30": ("Trimsamsa", 30),
+    "D40": ("Khavedamsa", 40),
+    "D45": ("Akshavedamsa", 45),
+    "D60": ("Shashtiamsa", 60),
+}
+
+def _counted(start_of_sign, segments, step=1):
+    # Varga sign = (start sign for this rasi + segment * step) % 12
+    return np.array([[(start_of_sign(sign) + k * step) % 12 for k in range(segments)] for sign in range(12)],
+                    dtype=np.int8)
+
+def _odd(sign):
+    # Aries, Gemini, ... (index 0, 2, ...) are the odd signs
+    return sign % 2 == 0
+
+def _trimsamsa_table():
+    # (upper degree, odd-sign ruler sign, even-sign ruler sign)
+    odd = [(5, 0), (10, 10), (18, 8), (25, 2), (30, 6)]    # Mars, Saturn, Jupiter, Mercury, Venus
+    even = [(5, 1), (12, 5), (20, 11), (25, 9), (30, 7)]   # Venus, Mercury, Jupiter, Saturn, Mars
+    table = np.empty((12, 30), dtype=np.int8)
+    for sign in range(12):
+        parts = odd if _odd(sign) else even
+        for degree in range(30):
+            table[sign, degree] = next(ruler for upper, ruler in parts if degree < upper)
+    return table
+
+def _hora_table():
+    # Odd signs: Sun's hora (Leo) then Moon's (Cancer); even signs the reverse
+    return np.array([[4, 3] if _odd(sign) else [3, 4] for sign in range(12)], dtype=np.int8)
+
+# (sign, segment) -> varga sign, built once at import
+TABLES = {
+    "D1": _counted(lambda s: s, 1),
+    "D2": _hora_table(),
+    "D3": _counted(lambda s: s, 3, step=4),
+    "D4": _counted(lambda s: s, 4, step=3),
+    "D7": _counted(lambda s: s if _odd(s) else s + 6, 7),
+    "D9": _counted(lambda s: s * 9, 9),
+    "D10": _counted(lambda s: s if _odd(s) else s + 8, 10),
+    "D12": _counted(lambda s: s, 12),
+    "D16": _counted(lambda s: (0, 4, 8)[s % 3], 16),
+    "D20": _counted(lambda s: (0, 8, 4)[s % 3], 20),
+    "D24": _counted(lambda s: 4 if _odd(s) else 3, 24),
+    "D27": _counted(lambda s: (0, 3, 6, 9)[s % 4], 27),
+    "D30": _trimsamsa_table(),
+    "D40": _counted(lambda s: 0 if _odd(s) else 6, 40),
+    "D45": _counted(lambda s: (0, 4, 8)[s % 3], 45),
+    "D60": _counted(lambda s: s, 60),
+}
+
+def varga_signs(sidereal_longitudes, varga: str):
+    """Varga sign indices (0=Aries) for any array of sidereal longitudes.
+
+    Pure table lookups, so a (charts x bodies) array is handled in one call.
+    """
+    table = TABLES[varga]
+    segments = table.shape[1]
+    lon = np.mod(np.asarray(sidereal_longitudes, dtype=float), 360)
+    sign = (lon // 30).astype(np.intp)
+    segment = np.minimum((lon % 30) * (segments / 30), segments - 1).astype(np.intp)
+    return table[sign, segment]
+
+def all_varga_signs(sidereal_longitudes, vargas=None):
+    return {varga: varga_signs(sidereal_longitudes, varga) for varga in (vargas or VARGAS)}
@@ -0,0 +1,265 @@
+from itertools import combinations, product
+import numpy as np
+
+# Graha indices follow the kundli's positions: ephemeris.PLANET_NAMES order, then Ketu.
+# ASCENDANT is the extra reference point that houses are counted from.
+GRAHAS = ("Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Rahu", "Ketu")
+SUN, MOON, MERCURY, VENUS, MARS, JUPITER, SATURN, RAHU, KETU = range(9)
+ASCENDANT = 9
+
+SIGN_LORDS = np.array([MARS, VENUS, MERCURY, MOON, SUN, MERCURY, VENUS, MARS, JUPITER, SATURN, SATURN, JUPITER])
+EXALTED = {SUN: 0, MOON: 1, MERCURY: 5, VENUS: 11, MARS: 9, JUPITER: 3, SATURN: 6}
+DEBILITATED = {planet: (sign + 6) % 12 for planet, sign in EXALTED.items()}
+OWN_SIGNS = {planet: tuple(int(s) for s in np.flatnonzero(SIGN_LORDS == planet)) for planet in EXALTED}
+
+KENDRAS = (1, 4, 7, 10)
+TRIKONAS = (1, 5, 9)
+DUSTHANAS = (6, 8, 12)
+UPACHAYAS = (3, 6, 10, 11)
+SEVEN = (SUN, MOON, MERCURY, VENUS, MARS, JUPITER, SATURN)
+# The five grahas other than the luminaries, whose placement around the Sun/Moon forms yogas
+TARA = (MERCURY, VENUS, MARS, JUPITER, SATURN)
+BENEFICS = (MERCURY, VENUS, JUPITER)
+MALEFICS = (SUN, MARS, SATURN, RAHU, KETU)
+
+# Whole-sign graha drishti as bits over (house counted from the graha - 1): every graha
+# aspects the 7th; Mars also the 4th/8th, Jupiter the 5th/9th, Saturn the 3rd/10th.
+# The nodes cast no aspect.
+DRISHTI = np.array([1 << 6] * 7 + [0, 0], dtype=np.uint16)
+DRISHTI[MARS] |= 1 << 3 | 1 << 7
+DRISHTI[JUPITER] |= 1 << 4 | 1 << 8
+DRISHTI[SATURN] |= 1 << 2 | 1 << 9
+
+# Feature families: name -> argument ranges. Every feature is a uint16 bitmask per chart,
+# so every rule atom is the same test: feature & mask != 0 (optionally negated).
+#   sign (graha): bit = sign
+#   from (ref, point): bit = house of point counted from ref, minus 1
+#   occupants (ref, house): bit per graha in that house counted from ref
+#   lord (house): bit = graha ruling the house (from the lagna)
+#   lord_in (house): bit = house the lord of this house occupies, minus 1
+#   aspects / aspected_by (graha): bit per graha it aspects / is aspected by
+#   lords_conjunct / lords_aspect / lords_exchange (house): bit per other house (minus 1)
+#     whose lord is conjunct with / in mutual aspect with / in exchange with this house's lord
+POINTS = range(10)
+HOUSES = range(1, 13)
+FAMILIES = {
+    "sign": (range(9),),
+    "from": (POINTS, POINTS),
+    "occupants": (POINTS, HOUSES),
+    "lord": (HOUSES,),
+    "lord_in": (HOUSES,),
+    "aspects": (range(9),),
+    "aspected_by": (range(9),),
+    "lords_conjunct": (HOUSES,),
+    "lords_aspect": (HOUSES,),
+    "lords_exchange": (HOUSES,),
+}
+# Bits of the values an atom names: houses are 1-based, signs and grahas 0-based
+HOUSE_VALUED = {"from", "lord_in", "lords_conjunct", "lords_aspect", "lords_exchange"}
+COLUMNS = {
+    (family, args): i
+    for i, (family, args) in enumerate(
+        (family, args) for family, ranges in FAMILIES.items() for args in product(*ranges)
+    )
+}
+
+GRAHA_BITS = 1 << np.arange(9)
+HOUSE_BITS = 1 << np.arange(12)
+_H12 = np.arange(12)
+_OTHER_GRAHA = ~np.eye(9, dtype=bool)
+_OTHER_HOUSE = ~np.eye(12, dtype=bool)
+
+def chart_features(lagna_signs, graha_signs):
+    """(N,) lagna signs and (N, 9) graha signs (0 = Aries, sidereal) -> (N, len(COLUMNS)) uint16."""
+    graha_signs = np.asarray(graha_signs, dtype=np.int64).reshape(-1, 9)
+    n = len(graha_signs)
+    points = np.concatenate([graha_signs, np.asarray(lagna_signs, dtype=np.int64).reshape(n, 1)], axis=1)
+    # rel[c, r, p]: house of point p counted from point r, minus 1
+    rel = (points[:, None, :] - points[:, :, None]) % 12
+    grahas = rel[:, :9, :9]
+    rows = np.arange(n)[:, None]
+    # Bit masks are packed with a matmul against the bit weights: the cheapest reduction here
+    by_sign = (graha_signs[:, :, None] == _H12).transpose(0, 2, 1) @ GRAHA_BITS
+    lord = SIGN_LORDS[(points[:, ASCENDANT, None] + _H12) % 12]
+    lord_house = rel[:, ASCENDANT][rows, lord]
+    aspect = ((DRISHTI[:, None] >> grahas) & 1).astype(bool)
+    mutual = aspect & aspect.transpose(0, 2, 1)
+    conjunct = (grahas == 0) & _OTHER_GRAHA
+    lord_pairs = (rows[:, :, None], lord[:, :, None], lord[:, None, :])
+    exchange = (lord_house[:, :, None] == _H12) & (lord_house[:, None, :] == _H12[:, None]) & _OTHER_HOUSE
+    blocks = {
+        "sign": 1 << graha_signs,
+        "from": (1 << rel).reshape(n, -1),
+        "occupants": by_sign[rows, (points[:, :, None] + _H12).reshape(n, -1) % 12],
+        "lord": 1 << lord,
+        "lord_in": 1 << lord_house,
+        "aspects": aspect @ GRAHA_BITS,
+        "aspected_by": aspect.transpose(0, 2, 1) @ GRAHA_BITS,
+        "lords_conjunct": conjunct[lord_pairs] @ HOUSE_BITS,
+        "lords_aspect": mutual[lord_pairs] @ HOUSE_BITS,
+        "lords_exchange": exchange @ HOUSE_BITS,
+    }
+    return np.concatenate([blocks[family] for family in FAMILIES], axis=1).astype(np.uint16)
+
+# Atom builders for the catalogue: (family, args, values[, negate])
+def sign_in(graha, signs):
+    return ("sign", (graha,), signs)
+
+def placed(point, houses, ref=ASCENDANT):
+    return ("from", (ref, point), houses)
+
+def any_in(grahas, house, ref=ASCENDANT):
+    return ("occupants", (ref, house), grahas)
+
+def none_in(grahas, house, ref=ASCENDANT):
+    return ("occupants", (ref, house), grahas, True)
+
+def lord_is(house, graha):
+    return ("lord", (house,), (graha,))
+
+def lord_in(house, houses):
+    return ("lord_in", (house,), houses)
+
+def associated(first, second):
+    # Clauses: the lords of two houses are conjunct, in mutual aspect or exchange signs
+    return [[("lords_conjunct", (first,), (second,))],
+            [("lords_aspect", (first,), (second,))],
+            [("lords_exchange", (first,), (second,))]]
+
+def _mahapurusha(graha):
+    strong = OWN_SIGNS[graha] + (EXALTED[graha],)
+    return [[sign_in(graha, strong), placed(graha, KENDRAS)],
+            [sign_in(graha, strong), placed(graha, KENDRAS, MOON)]]
+
+def _neecha_bhanga():
+    # Debilitated graha whose debilitation-sign lord or exaltation-sign lord is in a kendra
+    clauses = []
+    for graha in SEVEN:
+        for cancelling in {int(SIGN_LORDS[DEBILITATED[graha]]), int(SIGN_LORDS[EXALTED[graha]])}:
+            clauses.append([sign_in(graha, (DEBILITATED[graha],)), placed(cancelling, KENDRAS)])
+            if cancelling != MOON:
+                clauses.append([sign_in(graha, (DEBILITATED[graha],)), placed(cancelling, KENDRAS, MOON)])
+    return clauses
+
+def _exchanges(pairs):
+    return [[("lords_exchange", (a,), (b,))] for a, b in pairs]
+
+GOOD_HOUSES = (1, 2, 4, 5, 7, 9, 10, 11)
+KENDRA_TRIKONA_PAIRS = sorted({tuple(sorted(pair)) for pair in product(KENDRAS, TRIKONAS) if pair[0] != pair[1]})
+DHANA_PAIRS = [(2, 11), (1, 2), (2, 5), (2, 9), (1, 11), (5, 11), (9, 11)]
+
+# name -> (category, description, clauses); a yoga holds when any clause has all its atoms true.
+# Houses are whole signs counted from the lagna unless a rule counts from a graha.
+CATALOGUE = {
+    "Gajakesari": ("Lunar", "Jupiter in a kendra from the Moon", [[placed(JUPITER, KENDRAS, MOON)]]),
+    "Sunapha": ("Lunar", "A graha other than the Sun in the 2nd from the Moon", [[any_in(TARA, 2, MOON)]]),
+    "Anapha": ("Lunar", "A graha other than the Sun in the 12th from the Moon", [[any_in(TARA, 12, MOON)]]),
+    "Durudhara": ("Lunar", "Grahas other than the Sun on both sides of the Moon",
+                  [[any_in(TARA, 2, MOON), any_in(TARA, 12, MOON)]]),
+    "Kemadruma": ("Lunar", "No graha other than the Sun beside, with or in a kendra from the Moon",
+                  [[none_in(TARA, house, MOON) for house in (1, 2, 4, 7, 10, 12)]]),
+    "Adhi": ("Lunar", "Mercury, Venus and Jupiter in the 6th, 7th or 8th from the Moon",
+             [[placed(graha, (6, 7, 8), MOON) for graha in BENEFICS]]),
+    "Vasumati": ("Lunar", "Mercury, Venus and Jupiter in upachayas from the Moon",
+                 [[placed(graha, UPACHAYAS, MOON) for graha in BENEFICS]]),
+    "Chandra-Mangala": ("Lunar", "Moon conjunct Mars", [[placed(MARS, (1,), MOON)]]),
+    "Shakata": ("Lunar", "Moon in the 6th, 8th or 12th from Jupiter", [[placed(MOON, DUSTHANAS, JUPITER)]]),
+    "Amala": ("Lunar", "A benefic in the 10th from the lagna or the Moon",
+              [[any_in(BENEFICS, 10)], [any_in(BENEFICS, 10, MOON)]]),
+    "Vesi": ("Solar", "A graha other than the Moon in the 2nd from the Sun", [[any_in(TARA, 2, SUN)]]),
+    "Vasi": ("Solar", "A graha other than the Moon in the 12th from the Sun", [[any_in(TARA, 12, SUN)]]),
+    "Ubhayachari": ("Solar", "Grahas other than the Moon on both sides of the Sun",
+                    [[any_in(TARA, 2, SUN), any_in(TARA, 12, SUN)]]),
+    "Budha-Aditya": ("Solar", "Sun conjunct Mercury", [[placed(MERCURY, (1,), SUN)]]),
+    "Ruchaka": ("Pancha Mahapurusha", "Mars in its own or exaltation sign in a kendra", _mahapurusha(MARS)),
+    "Bhadra": ("Pancha Mahapurusha", "Mercury in its own or exaltation sign in a kendra", _mahapurusha(MERCURY)),
+    "Hamsa": ("Pancha Mahapurusha", "Jupiter in its own or exaltation sign in a kendra", _mahapurusha(JUPITER)),
+    "Malavya": ("Pancha Mahapurusha", "Venus in its own or exaltation sign in a kendra", _mahapurusha(VENUS)),
+    "Sasa": ("Pancha Mahapurusha", "Saturn in its own or exaltation sign in a kendra", _mahapurusha(SATURN)),
+    "Raja": ("Raja", "Lords of a kendra and a trikona conjunct, in mutual aspect or exchanging signs",
+             [clause for pair in KENDRA_TRIKONA_PAIRS for clause in associated(*pair)]),
+    "Yogakaraka": ("Raja", "One graha lords both a kendra and a trikona",
+                   [[lord_is(kendra, graha), lord_is(trikona, graha)]
+                    for graha in SEVEN for kendra in (4, 7, 10) for trikona in (5, 9)]),
+    "Dharma-Karmadhipati": ("Raja", "Lords of the 9th and 10th associated", associated(9, 10)),
+    "Neecha Bhanga Raja": ("Raja", "A debilitated graha whose debilitation is cancelled by a lord in a kendra",
+                           _neecha_bhanga()),
+    "Harsha": ("Viparita Raja", "Lord of the 6th in a dusthana", [[lord_in(6, DUSTHANAS)]]),
+    "Sarala": ("Viparita Raja", "Lord of the 8th in a dusthana", [[lord_in(8, DUSTHANAS)]]),
+    "Vimala": ("Viparita Raja", "Lord of the 12th in a dusthana", [[lord_in(12, DUSTHANAS)]]),
+    "Dhana": ("Dhana", "Lords of the 1st, 2nd, 5th, 9th and 11th associated",
+              [clause for pair in DHANA_PAIRS for clause in associated(*pair)]),
+    "Lakshmi": ("Dhana", "Lord of the 9th in its own or exaltation sign in a kendra or trikona",
+                [[lord_is(9, graha), sign_in(graha, OWN_SIGNS[graha] + (EXALTED[graha],)),
+                  placed(graha, KENDRAS + TRIKONAS)] for graha in SEVEN]),
+    "Maha Parivartana": ("Parivartana", "Lords of two good houses exchange signs",
+                         _exchanges(combinations(GOOD_HOUSES, 2))),
+    "Khala Parivartana": ("Parivartana", "Lord of the 3rd exchanges signs with a good house's lord",
+                          _exchanges((3, house) for house in GOOD_HOUSES)),
+    "Dainya Parivartana": ("Parivartana", "Lord of a dusthana exchanges signs with another house's lord",
+                           _exchanges((d, house) for d in DUSTHANAS for house in HOUSES
+                                      if house != d and not (house in DUSTHANAS and house < d))),
+    "Shubha Kartari": ("Lagna", "Benefics in the 2nd and 12th", [[any_in(BENEFICS, 2), any_in(BENEFICS, 12)]]),
+    "Papa Kartari": ("Lagna", "Malefics in the 2nd and 12th", [[any_in(MALEFICS, 2), any_in(MALEFICS, 12)]]),
+    "Parvata": ("Lagna", "A benefic in a kendra with the 6th and 8th free of malefics",
+                [[any_in(BENEFICS, kendra), none_in(MALEFICS, 6), none_in(MALEFICS, 8)] for kendra in KENDRAS]),
+    "Saraswati": ("Lagna", "Mercury, Venus and Jupiter in kendras, trikonas or the 2nd",
+                  [[placed(graha, (1, 2, 4, 5, 7, 9, 10)) for graha in BENEFICS]]),
+    "Chatussagara": ("Lagna", "Grahas in all four kendras", [[any_in(SEVEN, kendra) for kendra in KENDRAS]]),
+    "Guru-Mangala": ("Conjunction", "Jupiter conjunct or opposite Mars", [[placed(JUPITER, (1, 7), MARS)]]),
+    "Guru-Chandala": ("Conjunction", "Jupiter conjunct Rahu or Ketu",
+                      [[placed(JUPITER, (1,), RAHU)], [placed(JUPITER, (1,), KETU)]]),
+    "Angaraka": ("Conjunction", "Mars conjunct Rahu or Ketu", [[placed(MARS, (1,), RAHU)], [placed(MARS, (1,), KETU)]]),
+    "Grahan": ("Conjunction", "Sun or Moon conjunct Rahu or Ketu",
+               [[placed(luminary, (1,), node)] for luminary in (SUN, MOON) for node in (RAHU, KETU)]),
+    "Kala Sarpa": ("Nodal", "All seven grahas between Rahu and Ketu on one side",
+                   [[placed(graha, range(1, 8), RAHU) for graha in SEVEN],
+                    [placed(graha, (7, 8, 9, 10, 11, 12, 1), RAHU) for graha in SEVEN]]),
+}
+
+class YogaEngine:
+    """Yoga catalogue compiled to one vectorised pass over chart_features().
+
+    Atoms are laid out clause by clause and clauses rule by rule, so a detection is a
+    gather, a mask test and two reduceat calls, for one chart or a batch of them.
+    """
+
+    def __init__(self, catalogue=None):
+        self.catalogue = CATALOGUE if catalogue is None else catalogue
+        self.names = list(self.catalogue)
+        columns, masks, negate, clause_starts, rule_starts = [], [], [], [], []
+        for name, (_, _, clauses) in self.catalogue.items():
+            if not clauses or not all(clauses):
+                raise ValueError(f"Yoga {name} has an empty rule")
+            rule_starts.append(len(clause_starts))
+            for clause in clauses:
+                clause_starts.append(len(columns))
+                for family, args, values, *negated in clause:
+                    offset = 1 if family in HOUSE_VALUED else 0
+                    columns.append(COLUMNS[(family, args)])
+                    masks.append(sum(1 << (value - offset) for value in set(values)))
+                    negate.append(bool(negated and negated[0]))
+        self.columns = np.array(columns)
+        self.masks = np.array(masks, dtype=np.uint16)
+        self.negate = np.array(negate)
+        self.clause_starts = np.array(clause_starts)
+        self.rule_starts = np.array(rule_starts)
+
+    def evaluate(self, features):
+        # (N, features) -> (N, yogas) bool
+        atoms = ((features[:, self.columns] & self.masks) != 0) ^ self.negate
+        clauses = np.logical_and.reduceat(atoms, self.clause_starts, axis=1)
+        return np.logical_or.reduceat(clauses, self.rule_starts, axis=1)
+
+    def detect_batch(self, lagna_signs, graha_signs):
+        return self.evaluate(chart_features(lagna_signs, graha_signs))
+
+    def detect(self, lagna_sign, graha_signs):
+        # One chart -> [{"name", "category", "description"}] in catalogue order
+        present = self.detect_batch([lagna_sign], [graha_signs])[0]
+        return [
+            {"name": name, "category": self.catalogue[name][0], "description": self.catalogue[name][1]}
+            for name, hit in zip(self.names, present) if hit
+        ]
+
+ENGINE = YogaEngine()